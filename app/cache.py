@@ -0,0 +1,302 @@
+import functools
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Callable, Optional, Tuple
+
+import orjson
+import ormsgpack
+import xxhash
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = float(os.getenv("CACHE_TTL", "300"))
+# Seconds to wait on the Redis server before treating a call as a miss.
+CACHE_TIMEOUT = float(os.getenv("CACHE_TIMEOUT", "0.5"))
+
+
+def make_key(*parts: Any) -> str:
+    """Hash JSON-serializable key parts into a short, fixed-length cache key."""
+    return xxhash.xxh64_hexdigest(orjson.dumps(parts))
+
+
+class CacheBackend(ABC):
+    """
+    Interface shared by the cache implementations.
+
+    Values must be treated as immutable once stored: the in-process backend
+    hands back the same object on every hit.
+
+    ``clear()`` starts a new generation. ``lookup()`` returns the current
+    generation along with the value, and passing it back to ``set()`` keeps a
+    result computed before a clear from being stored as current. The ``a*``
+    methods are for async callers; backends doing network I/O override them.
+    """
+
+    @abstractmethod
+    def lookup(self, key: str) -> Tuple[Optional[int], Optional[Any]]:
+        """
+        Return ``(generation, value)``; value is None on a miss, generation is
+        None if the backend could not be reached.
+        """
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.lookup(key)[1]
+
+    @abstractmethod
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[float] = None,
+        generation: Optional[int] = None,
+    ) -> None: ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+    async def alookup(self, key: str) -> Tuple[Optional[int], Optional[Any]]:
+        return self.lookup(key)
+
+    async def aset(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[float] = None,
+        generation: Optional[int] = None,
+    ) -> None:
+        self.set(key, value, ttl, generation)
+
+    async def aclear(self) -> None:
+        self.clear()
+
+
+class LRUCache(CacheBackend):
+    """Per-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, key: str) -> Tuple[Optional[int], Optional[Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return self._generation, None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return self._generation, None
+            self._entries.move_to_end(key)
+            return self._generation, value
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[float] = None,
+        generation: Optional[int] = None,
+    ) -> None:
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+
+def _pack_default(value: Any) -> Any:
+    # Postgres aggregates come back as Decimal; store them the way the JSON
+    # responses render them.
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Cannot cache value of type {type(value).__name__}")
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache shared by every worker on a Redis-compatible server.
+
+    Values are serialized with msgpack. ``clear()`` bumps a generation counter
+    instead of scanning keys, so it is O(1); entries written under an older
+    generation read as misses and expire through their TTL.
+
+    The cache fails open: if the server is slow or unreachable, lookups are
+    misses and writes and clears are dropped, so an outage costs database
+    queries rather than failed requests.
+    """
+
+    def __init__(self, url: str, namespace: str, ttl: float = DEFAULT_TTL):
+        import redis
+        import redis.asyncio
+
+        options = {
+            "socket_timeout": CACHE_TIMEOUT,
+            "socket_connect_timeout": CACHE_TIMEOUT,
+        }
+        self.client = redis.Redis.from_url(url, **options)
+        self.async_client = redis.asyncio.Redis.from_url(url, **options)
+        self._errors = (redis.RedisError, OSError)
+        self.namespace = namespace
+        self.ttl = ttl
+        self._generation_key = f"{namespace}:generation"
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _unavailable(self, operation: str, error: Exception) -> None:
+        logger.warning("Cache %s %s failed: %s", self.namespace, operation, error)
+
+    def _unpack(
+        self, generation: Optional[bytes], packed: Optional[bytes]
+    ) -> Tuple[Optional[int], Optional[Any]]:
+        generation = int(generation or 0)
+        if packed is None:
+            return generation, None
+        stored_generation, value = ormsgpack.unpackb(packed)
+        if stored_generation != generation:
+            return generation, None
+        return generation, value
+
+    def _pack(self, value: Any, generation: int) -> bytes:
+        return ormsgpack.packb((generation, value), default=_pack_default)
+
+    def _px(self, ttl: Optional[float]) -> int:
+        return int((ttl if ttl is not None else self.ttl) * 1000)
+
+    def lookup(self, key: str) -> Tuple[Optional[int], Optional[Any]]:
+        try:
+            generation, packed = (
+                self.client.pipeline(transaction=False)
+                .get(self._generation_key)
+                .get(self._key(key))
+                .execute()
+            )
+        except self._errors as error:
+            self._unavailable("lookup", error)
+            return None, None
+        return self._unpack(generation, packed)
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[float] = None,
+        generation: Optional[int] = None,
+    ) -> None:
+        try:
+            if generation is None:
+                generation = int(self.client.get(self._generation_key) or 0)
+            self.client.set(
+                self._key(key), self._pack(value, generation), px=self._px(ttl)
+            )
+        except self._errors as error:
+            self._unavailable("set", error)
+
+    def delete(self, key: str) -> None:
+        try:
+            self.client.delete(self._key(key))
+        except self._errors as error:
+            self._unavailable("delete", error)
+
+    def clear(self) -> None:
+        try:
+            self.client.incr(self._generation_key)
+        except self._errors as error:
+            self._unavailable("clear", error)
+
+    async def alookup(self, key: str) -> Tuple[Optional[int], Optional[Any]]:
+        try:
+            generation, packed = await (
+                self.async_client.pipeline(transaction=False)
+                .get(self._generation_key)
+                .get(self._key(key))
+                .execute()
+            )
+        except self._errors as error:
+            self._unavailable("lookup", error)
+            return None, None
+        return self._unpack(generation, packed)
+
+    async def aset(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[float] = None,
+        generation: Optional[int] = None,
+    ) -> None:
+        try:
+            if generation is None:
+                generation = int(await self.async_client.get(self._generation_key) or 0)
+            await self.async_client.set(
+                self._key(key), self._pack(value, generation), px=self._px(ttl)
+            )
+        except self._errors as error:
+            self._unavailable("set", error)
+
+    async def aclear(self) -> None:
+        try:
+            await self.async_client.incr(self._generation_key)
+        except self._errors as error:
+            self._unavailable("clear", error)
+
+
+def get_cache(namespace: str) -> CacheBackend:
+    """
+    Build the cache backend selected by the environment.
+
+    ``CACHE_URL`` set to a ``redis://`` URL selects the shared backend;
+    otherwise each process gets its own LRU of ``CACHE_MAX_ENTRIES`` entries.
+    """
+    url = os.getenv("CACHE_URL")
+    if url and url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCache(url, namespace)
+    return LRUCache(maxsize=int(os.getenv("CACHE_MAX_ENTRIES", "1024")))
+
+
+def cached(cache: CacheBackend, ttl: Optional[float] = None) -> Callable:
+    """
+    Memoize a function's results in ``cache``, keyed on its name and arguments.
+
+    The result is stored under the generation current *before* the call, so
+    a clear that lands while the function runs discards it rather than
+    keeping pre-change data for the whole TTL. The wrapper keeps the wrapped
+    signature, so it can sit under ``@mcp.tool()``.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(func.__name__, args, sorted(kwargs.items()))
+            generation, hit = cache.lookup(key)
+            if hit is not None:
+                return hit
+            result = func(*args, **kwargs)
+            if generation is not None:
+                cache.set(key, result, ttl, generation=generation)
+            return result
+
+        return wrapper
+
+    return decorator
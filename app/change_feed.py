@@ -0,0 +1,279 @@
+import asyncio
+import logging
+import select
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+import orjson
+from sqlalchemy import DDL
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "property_changes"
+
+# Ids per notification: pg_notify payloads are limited to 8000 bytes.
+NOTIFY_CHUNK = 500
+
+# Installed on the properties table by app.models.create_schema. The BEFORE
+# trigger maintains updated_at/version per row; the statement-level AFTER
+# triggers publish each statement's changed ids on CHANNEL, in chunks of
+# NOTIFY_CHUNK, once the writing transaction commits, so a bulk update sends
+# a handful of notifications instead of one per row. Transition tables are
+# only allowed on single-event triggers, hence one trigger per operation.
+PROPERTY_CHANGE_DDL = [
+    DDL("""
+        CREATE OR REPLACE FUNCTION touch_property() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at := now();
+            NEW.version := OLD.version + 1;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """),
+    DDL("""
+        CREATE OR REPLACE TRIGGER touch_property
+        BEFORE UPDATE ON properties
+        FOR EACH ROW EXECUTE FUNCTION touch_property()
+        """),
+    DDL(f"""
+        CREATE OR REPLACE FUNCTION notify_property_change() RETURNS trigger AS $$
+        DECLARE
+            changed_ids integer[];
+            place_changed boolean := TG_OP <> 'UPDATE';
+            changed_at double precision := extract(epoch from clock_timestamp());
+            chunk_start integer := 1;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                SELECT array_agg(id ORDER BY id) INTO changed_ids FROM old_rows;
+            ELSE
+                SELECT array_agg(id ORDER BY id) INTO changed_ids FROM new_rows;
+            END IF;
+            IF TG_OP = 'UPDATE' THEN
+                -- Compared as sets: transition tables have no index to join on.
+                SELECT EXISTS (
+                    SELECT city, community FROM new_rows
+                    EXCEPT SELECT city, community FROM old_rows
+                ) OR EXISTS (
+                    SELECT city, community FROM old_rows
+                    EXCEPT SELECT city, community FROM new_rows
+                ) INTO place_changed;
+            END IF;
+
+            WHILE chunk_start <= coalesce(array_length(changed_ids, 1), 0) LOOP
+                PERFORM pg_notify('{CHANNEL}', jsonb_build_object(
+                    'op', TG_OP,
+                    'ids', to_jsonb(
+                        changed_ids[chunk_start:chunk_start + {NOTIFY_CHUNK} - 1]
+                    ),
+                    'place_changed', place_changed,
+                    'ts', changed_at
+                )::text);
+                chunk_start := chunk_start + {NOTIFY_CHUNK};
+            END LOOP;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """),
+    # Replaced by the statement-level triggers below.
+    DDL("DROP TRIGGER IF EXISTS notify_property_change ON properties"),
+    *(
+        DDL(f"""
+            CREATE OR REPLACE TRIGGER notify_property_change_{op.lower()}
+            AFTER {op} ON properties
+            REFERENCING {tables}
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_property_change()
+            """)
+        for op, tables in [
+            ("INSERT", "NEW TABLE AS new_rows"),
+            ("UPDATE", "NEW TABLE AS new_rows OLD TABLE AS old_rows"),
+            ("DELETE", "OLD TABLE AS old_rows"),
+        ]
+    ),
+]
+
+
+@dataclass(frozen=True)
+class PropertyChange:
+    """
+    Rows of the properties table changed by one statement.
+
+    ``op`` is INSERT, UPDATE or DELETE, and ``ids`` the changed rows; a
+    statement touching more than NOTIFY_CHUNK rows arrives as several
+    changes. ``place_changed`` is set when the statement can have added or
+    removed a city or community name.
+
+    ``op`` is RESYNC when the listener has reconnected, or connected only
+    after a failed attempt, so notifications may have been missed; consumers
+    should then rebuild from scratch. The first successful connection is not
+    a RESYNC: consumers start empty and load lazily.
+    """
+
+    op: str
+    ids: Tuple[int, ...] = ()
+    place_changed: bool = True
+    ts: Optional[float] = None
+
+    @classmethod
+    def from_payload(cls, payload: str) -> "PropertyChange":
+        data = orjson.loads(payload)
+        data["ids"] = tuple(data.get("ids") or ())
+        return cls(**data)
+
+    @property
+    def lag(self) -> Optional[float]:
+        """Seconds between the statement and now."""
+        return time.time() - self.ts if self.ts is not None else None
+
+
+RESYNC = PropertyChange(op="RESYNC")
+
+
+class ChangeFeed:
+    """
+    In-process fan-out of property changes to subscribed callbacks.
+
+    Listeners publish the notifications that arrive together as one batch.
+    ``subscribe()`` callbacks get each change; ``subscribe_batch()`` callbacks
+    get each batch once, for work such as a cache clear that only needs to
+    happen once however many rows a statement touched. A failing subscriber
+    is logged and does not stop delivery to the others.
+    """
+
+    def __init__(self):
+        self._subscribers: List[Callable[[PropertyChange], None]] = []
+        self._batch_subscribers: List[Callable[[List[PropertyChange]], None]] = []
+
+    def subscribe(self, callback: Callable[[PropertyChange], None]) -> None:
+        self._subscribers.append(callback)
+
+    def subscribe_batch(self, callback: Callable[[List[PropertyChange]], None]) -> None:
+        self._batch_subscribers.append(callback)
+
+    def publish(self, change: PropertyChange) -> None:
+        self.publish_batch([change])
+
+    def publish_batch(self, changes: List[PropertyChange]) -> None:
+        if not changes:
+            return
+        for callback in self._subscribers:
+            for change in changes:
+                try:
+                    callback(change)
+                except Exception:
+                    logger.exception("Property change subscriber %r failed", callback)
+        for callback in self._batch_subscribers:
+            try:
+                callback(changes)
+            except Exception:
+                logger.exception("Property change subscriber %r failed", callback)
+
+
+property_changes = ChangeFeed()
+
+
+def _libpq_dsn(database_url: str) -> str:
+    """Strip the SQLAlchemy driver suffix so the URL can go to the raw driver."""
+    return (
+        make_url(database_url)
+        .set(drivername="postgresql")
+        .render_as_string(hide_password=False)
+    )
+
+
+async def listen(
+    feed: ChangeFeed, database_url: str, reconnect_delay: float = 5.0
+) -> None:
+    """
+    Forward notifications to ``feed`` from an asyncpg connection, reconnecting
+    on any failure. Runs until cancelled.
+    """
+    import asyncpg
+
+    dsn = _libpq_dsn(database_url)
+    loop = asyncio.get_running_loop()
+    pending: List[PropertyChange] = []
+
+    def flush() -> None:
+        batch = pending[:]
+        pending.clear()
+        feed.publish_batch(batch)
+
+    def on_notification(_conn, _pid, _channel, payload: str) -> None:
+        # asyncpg schedules one callback per notification read off the socket;
+        # flushing on the next loop iteration delivers them as one batch.
+        if not pending:
+            loop.call_soon(flush)
+        pending.append(PropertyChange.from_payload(payload))
+
+    first_attempt = True
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(dsn, timeout=reconnect_delay * 2)
+            closed = asyncio.Event()
+            conn.add_termination_listener(lambda _conn: closed.set())
+            await conn.add_listener(CHANNEL, on_notification)
+            if not first_attempt:
+                feed.publish(RESYNC)
+            first_attempt = False
+            await closed.wait()
+            logger.warning("Change feed connection lost, reconnecting")
+        except Exception:
+            first_attempt = False
+            logger.exception("Change feed connection failed, retrying")
+            await asyncio.sleep(reconnect_delay)
+        finally:
+            if conn is not None:
+                conn.terminate()
+
+
+def start_listener_thread(
+    feed: ChangeFeed, database_url: str, reconnect_delay: float = 5.0
+) -> threading.Thread:
+    """
+    Forward notifications to ``feed`` from a psycopg2 connection on a daemon
+    thread, for processes without an event loop of their own.
+    """
+    import psycopg2
+
+    dsn = _libpq_dsn(database_url)
+
+    def run():
+        first_attempt = True
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(
+                    dsn, connect_timeout=max(2, int(reconnect_delay * 2))
+                )
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+                if not first_attempt:
+                    feed.publish(RESYNC)
+                first_attempt = False
+
+                while True:
+                    if select.select([conn], [], [], 60) == ([], [], []):
+                        continue
+                    conn.poll()
+                    batch = [
+                        PropertyChange.from_payload(notify.payload)
+                        for notify in conn.notifies
+                    ]
+                    conn.notifies.clear()
+                    feed.publish_batch(batch)
+            except Exception:
+                first_attempt = False
+                logger.exception("Change feed connection failed, retrying")
+                time.sleep(reconnect_delay)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    thread = threading.Thread(target=run, name="property-change-feed", daemon=True)
+    thread.start()
+    return thread
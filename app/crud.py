@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional
 
 from sqlalchemy import and_
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -6,34 +6,110 @@ from sqlalchemy.future import select
 
 from app.models import Property
 
+# Columns selected directly when ORM objects are not needed.
+PROPERTY_COLUMNS = (
+    Property.id,
+    Property.no_of_bedrooms,
+    Property.no_of_bathrooms,
+    Property.carpet_area,
+    Property.total_area,
+    Property.country,
+    Property.state,
+    Property.city,
+    Property.community,
+    Property.building_name,
+    Property.asking_price,
+)
 
-async def get_filtered_properties(
-    db: AsyncSession,
+
+def build_property_filters(
     city: Optional[str] = None,
     min_price: Optional[int] = None,
     max_price: Optional[int] = None,
     bhk: Optional[int] = None,
-    limit: int = 20,
-    offset: int = 0,
-) -> List[Dict]:
+) -> List:
     """
-    Async query to fetch properties for FastAPI.
+    Build the WHERE clauses shared by the property queries.
+
+    ``city`` is a case-insensitive substring match on the stored name. Unlike
+    the MCP tools, which first resolve free-form input (misspellings, partial
+    names) through the place index, the API matches the text as given, so
+    "Mumbai" also returns "Navi Mumbai" and "hydrabad" returns nothing.
     """
     filters = []
 
     if city:
         filters.append(Property.city.ilike(f"%{city}%"))
-    if bhk:
+    if bhk is not None:
         filters.append(Property.no_of_bedrooms == bhk)
     if max_price is not None:
         filters.append(Property.asking_price <= max_price)
     if min_price is not None:
         filters.append(Property.asking_price >= min_price)
 
-    query = select(Property).where(and_(*filters)).limit(limit).offset(offset)
+    return filters
+
+
+async def get_filtered_properties(
+    db: AsyncSession,
+    city: Optional[str] = None,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    bhk: Optional[int] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> List[Dict]:
+    """
+    Async query to fetch properties for FastAPI.
+    """
+    filters = build_property_filters(city, min_price, max_price, bhk)
+
+    query = (
+        select(*PROPERTY_COLUMNS)
+        .where(and_(*filters))
+        .order_by(Property.id)
+        .limit(limit)
+        .offset(offset)
+    )
+    result = await db.execute(query)
+    return [dict(row) for row in result.mappings().all()]
+
+
+async def get_property(db: AsyncSession, property_id: int) -> Optional[Dict]:
+    """
+    Async query to fetch a single property by ID, or None if it does not exist.
+    """
+    query = select(*PROPERTY_COLUMNS).where(Property.id == property_id)
     result = await db.execute(query)
-    properties = result.scalars().all()
-    return [serialize_property(p) for p in properties]
+    row = result.mappings().first()
+    return dict(row) if row else None
+
+
+async def stream_properties(
+    db: AsyncSession,
+    city: Optional[str] = None,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    bhk: Optional[int] = None,
+    batch_size: int = 1000,
+) -> AsyncIterator[List[Dict]]:
+    """
+    Stream matching properties in batches through a server-side cursor.
+
+    Columns are selected directly so no ORM objects are hydrated, and at most
+    ``batch_size`` rows are held in memory at a time.
+    """
+    filters = build_property_filters(city, min_price, max_price, bhk)
+
+    query = (
+        select(*PROPERTY_COLUMNS)
+        .where(and_(*filters))
+        .order_by(Property.id)
+        .execution_options(yield_per=batch_size)
+    )
+    result = await db.stream(query)
+    async for partition in result.mappings().partitions():
+        yield [dict(row) for row in partition]
 
 
 def serialize_property(p: Property) -> Dict:
@@ -1,17 +1,22 @@
+import asyncio
 import logging
 import os
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
 from dotenv import load_dotenv
+from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
 
+from app.routing import AsyncReadRouter, split_urls
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 Base = declarative_base()
 
 ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+ASYNC_READ_REPLICA_URLS = os.getenv("ASYNC_READ_REPLICA_URLS")
 
 engine = create_async_engine(
     ASYNC_DATABASE_URL,
@@ -23,6 +28,23 @@ engine = create_async_engine(
 AsyncSessionLocal = async_sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False
 )
+# Interactive reads on the primary share ``engine``'s pool.
+read_router = AsyncReadRouter(
+    ASYNC_DATABASE_URL, split_urls(ASYNC_READ_REPLICA_URLS), primary_engine=engine
+)
+
+
+async def read_session(
+    workload: str = "interactive", fresh: bool = False
+) -> AsyncSession:
+    """
+    Session on a read replica (or the primary) sized for ``workload``.
+
+    Pass ``fresh=True`` for reads whose results are cached, so they go to the
+    primary while replicas may still be behind the last invalidation.
+    """
+    engine = await read_router.engine(workload, fresh=fresh)
+    return AsyncSession(bind=engine, expire_on_commit=False)
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -30,18 +52,57 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
     try:
         async with AsyncSessionLocal() as session:
             yield session
+    except HTTPException:
+        # Raised by the endpoint (e.g. a 404), not a database failure.
+        raise
+    except Exception as e:
+        logger.exception("Database session failed")
+        raise
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency for getting an async session for read-only, cached queries"""
+    try:
+        async with await read_session(fresh=True) as session:
+            yield session
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception("Database session failed")
         raise
 
 
+async def init_models() -> None:
+    """
+    Create any missing tables and upgrade an existing schema in place.
+
+    Run once per deployment (``python -m app.db`` or ``seed_db.py``) rather
+    than on every process start.
+    """
+    from app.models import create_schema
+
+    async with engine.begin() as conn:
+        await conn.run_sync(create_schema)
+
+
 @asynccontextmanager
 async def lifespan(app):
+    from app.change_feed import listen, property_changes
+
+    listener = asyncio.create_task(listen(property_changes, ASYNC_DATABASE_URL))
     try:
         logger.info("Starting up DB connection...")
-        async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
         yield
     finally:
         logger.info("Shutting down DB connection...")
+        listener.cancel()
         await engine.dispose()
+        await read_router.dispose()
+
+
+if __name__ == "__main__":
+    # Run as a script this module is ``__main__``, and app.models registers
+    # its tables on the Base of the importable ``app.db`` copy instead.
+    from app.db import init_models
+
+    asyncio.run(init_models())
@@ -0,0 +1,113 @@
+import io
+import logging
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+import orjson
+
+from app.crud import stream_properties
+from app.db import read_session
+
+logger = logging.getLogger(__name__)
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def encode_ndjson(rows: List[Dict]) -> bytes:
+    """
+    Encode a batch of rows as newline-delimited JSON.
+    """
+    return b"".join(orjson.dumps(row) + b"\n" for row in rows)
+
+
+class ArrowStreamEncoder:
+    """
+    Encode batches of rows as an Arrow IPC stream.
+
+    The schema message is emitted with the first batch and the end-of-stream
+    marker by ``close()``.
+    """
+
+    def __init__(self):
+        import pyarrow as pa
+
+        self._pa = pa
+        self.schema = pa.schema(
+            [
+                ("id", pa.int64()),
+                ("no_of_bedrooms", pa.int32()),
+                ("no_of_bathrooms", pa.int32()),
+                ("carpet_area", pa.int32()),
+                ("total_area", pa.int32()),
+                ("country", pa.string()),
+                ("state", pa.string()),
+                ("city", pa.string()),
+                ("community", pa.string()),
+                ("building_name", pa.string()),
+                ("asking_price", pa.int64()),
+            ]
+        )
+        self._sink = io.BytesIO()
+        self._writer = pa.ipc.new_stream(self._sink, self.schema)
+
+    def _drain(self) -> bytes:
+        chunk = self._sink.getvalue()
+        self._sink.seek(0)
+        self._sink.truncate()
+        return chunk
+
+    def encode(self, rows: List[Dict]) -> bytes:
+        batch = self._pa.RecordBatch.from_pylist(rows, schema=self.schema)
+        self._writer.write_batch(batch)
+        return self._drain()
+
+    def close(self) -> bytes:
+        self._writer.close()
+        return self._drain()
+
+
+async def export_properties(
+    fmt: str = "ndjson",
+    city: Optional[str] = None,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    bhk: Optional[int] = None,
+    batch_size: int = 1000,
+) -> AsyncIterator[bytes]:
+    """
+    Yield an export of the matching properties in the requested format.
+
+    The session is opened here rather than through ``get_db`` because the
+    response body is produced after the endpoint has returned. Exports run on
+    the analytics pool so they do not hold interactive connections.
+    """
+    arrow = ArrowStreamEncoder() if fmt == "arrow" else None
+    rows = 0
+    started = time.perf_counter()
+
+    async with await read_session("analytics") as session:
+        async for batch in stream_properties(
+            session,
+            city=city,
+            min_price=min_price,
+            max_price=max_price,
+            bhk=bhk,
+            batch_size=batch_size,
+        ):
+            rows += len(batch)
+            yield arrow.encode(batch) if arrow else encode_ndjson(batch)
+
+    if arrow:
+        yield arrow.close()
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        "Exported %d properties as %s in %.3fs (%.0f rows/s)",
+        rows,
+        fmt,
+        elapsed,
+        rows / elapsed if elapsed else 0.0,
+    )
@@ -0,0 +1,248 @@
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+def normalize_place(name: str) -> str:
+    """Lower-case a place name and collapse punctuation and whitespace."""
+    return " ".join(re.findall(r"[a-z0-9]+", name.lower()))
+
+
+class _TrieNode:
+    __slots__ = ("children", "names")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.names: List[str] = []
+
+
+class PlaceTrie:
+    """
+    Trie of normalized place names supporting prefix and fuzzy lookup.
+
+    Each terminal node stores every spelling of the name as stored in the
+    database ("Bangalore", "bangalore"), since a filter on one spelling would
+    miss the rows stored under the others. Lookups return the first spelling
+    added, so callers add the most common spelling first; ``resolve()``
+    returns all of them.
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.root = _TrieNode()
+        self.keys: List[str] = []
+        for name in names:
+            self.add(name)
+
+    @property
+    def size(self) -> int:
+        return len(self.keys)
+
+    def add(self, name: str) -> None:
+        key = normalize_place(name)
+        if not key:
+            return
+        node = self.root
+        for ch in key:
+            node = node.children.setdefault(ch, _TrieNode())
+        if not node.names:
+            self.keys.append(key)
+        if name not in node.names:
+            node.names.append(name)
+
+    def get(self, query: str) -> List[str]:
+        """Every stored spelling of ``query``, or an empty list."""
+        node = self._find(normalize_place(query))
+        return list(node.names) if node else []
+
+    def prefix(self, query: str, limit: int = 10) -> List[str]:
+        """Return up to ``limit`` names starting with ``query``, shortest first."""
+        return [node.names[0] for _, node in self._prefix_nodes(query, limit=limit)]
+
+    def fuzzy(
+        self, query: str, max_distance: int = 2, limit: int = 10
+    ) -> List[Tuple[int, str]]:
+        """
+        Return ``(distance, name)`` pairs within ``max_distance`` edits of ``query``.
+
+        The Levenshtein table is computed one row per trie edge, and branches
+        whose best cell already exceeds ``max_distance`` are pruned.
+        """
+        return [
+            (distance, node.names[0])
+            for distance, node in self._fuzzy_nodes(query, max_distance, limit)
+        ]
+
+    def resolve(self, query: str) -> Optional[List[str]]:
+        """
+        Canonicalize user input to the spellings of one stored name, or None
+        if it is ambiguous.
+
+        Tries an exact match, then a unique prefix match, then the closest
+        fuzzy match within an edit budget that grows with the input length.
+        A prefix that also occurs inside another name ("mum" in "Navi
+        Mumbai") is left unresolved, so the caller's substring match still
+        finds both.
+        """
+        word = normalize_place(query)
+        if not word:
+            return None
+        exact = self.get(word)
+        if exact:
+            return exact
+
+        prefixed = self._prefix_nodes(word, limit=2)
+        if len(prefixed) == 1:
+            key, node = prefixed[0]
+            if not any(word in other for other in self.keys if other != key):
+                return list(node.names)
+            return None
+
+        max_distance = min(2, max(1, len(word) // 4))
+        candidates = self._fuzzy_nodes(word, max_distance=max_distance, limit=2)
+        if len(candidates) == 1 or (
+            len(candidates) == 2 and candidates[0][0] < candidates[1][0]
+        ):
+            return list(candidates[0][1].names)
+        return None
+
+    def suggest(self, query: str, limit: int = 5) -> List[str]:
+        """Prefix matches first, topped up with fuzzy matches."""
+        suggestions = self.prefix(query, limit=limit)
+        if len(suggestions) < limit:
+            for _, name in self.fuzzy(query, max_distance=2, limit=limit):
+                if name not in suggestions:
+                    suggestions.append(name)
+        return suggestions[:limit]
+
+    def _find(self, key: str) -> Optional[_TrieNode]:
+        node = self.root
+        for ch in key:
+            node = node.children.get(ch)
+            if node is None:
+                return None
+        return node
+
+    def _prefix_nodes(self, query: str, limit: int) -> List[Tuple[str, _TrieNode]]:
+        key = normalize_place(query)
+        start = self._find(key) if key else None
+        if start is None:
+            return []
+
+        matches = []
+        queue = deque([(key, start)])
+        while queue and len(matches) < limit:
+            path, node = queue.popleft()
+            if node.names:
+                matches.append((path, node))
+            queue.extend((path + ch, node.children[ch]) for ch in sorted(node.children))
+        return matches
+
+    def _fuzzy_nodes(
+        self, query: str, max_distance: int, limit: int
+    ) -> List[Tuple[int, _TrieNode]]:
+        """Like ``fuzzy()``, but returns the matching nodes."""
+        word = normalize_place(query)
+        if not word:
+            return []
+
+        matches = []
+        first_row = list(range(len(word) + 1))
+        stack = [(child, ch, first_row) for ch, child in self.root.children.items()]
+        while stack:
+            node, ch, prev_row = stack.pop()
+            row = [prev_row[0] + 1]
+            for col in range(1, len(word) + 1):
+                row.append(
+                    min(
+                        row[col - 1] + 1,
+                        prev_row[col] + 1,
+                        prev_row[col - 1] + (word[col - 1] != ch),
+                    )
+                )
+
+            if node.names and row[-1] <= max_distance:
+                matches.append((row[-1], node))
+            if min(row) <= max_distance:
+                stack.extend(
+                    (child, next_ch, row) for next_ch, child in node.children.items()
+                )
+
+        matches.sort(key=lambda match: (match[0], match[1].names[0]))
+        return matches[:limit]
+
+
+class PlaceIndex:
+    """
+    In-memory index of the distinct city and community names in the database.
+
+    ``loader`` returns ``(cities, communities)``, each most common spelling
+    first (see ``PlaceTrie``). The index is rebuilt by ``refresh()`` and
+    automatically once it is older than ``ttl`` seconds.
+
+    Lookups, reloads and ``invalidate()`` share a lock, since the change feed
+    invalidates the index from its own thread while tool calls are reading.
+    A reload holds the lock while the loader runs, so an invalidation that
+    arrives meanwhile takes effect after it instead of being overwritten by
+    its timestamp.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Tuple[Iterable[str], Iterable[str]]],
+        ttl: float = 300.0,
+    ):
+        self._loader = loader
+        self._lock = threading.Lock()
+        self.ttl = ttl
+        self.loaded_at: Optional[float] = None
+        self.cities = PlaceTrie()
+        self.communities = PlaceTrie()
+
+    def refresh(self) -> None:
+        with self._lock:
+            self._load()
+
+    def _load(self) -> None:
+        cities, communities = self._loader()
+        self.cities, self.communities = PlaceTrie(cities), PlaceTrie(communities)
+        self.loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        """Force a reload on the next lookup, e.g. after names were added or removed."""
+        with self._lock:
+            self.loaded_at = None
+
+    def _stale(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl
+
+    def _ensure_fresh(self) -> None:
+        if self._stale():
+            with self._lock:
+                if self._stale():
+                    self._load()
+
+    def resolve_city(self, query: str) -> Optional[List[str]]:
+        self._ensure_fresh()
+        with self._lock:
+            return self.cities.resolve(query)
+
+    def resolve_community(self, query: str) -> Optional[List[str]]:
+        self._ensure_fresh()
+        with self._lock:
+            return self.communities.resolve(query)
+
+    def suggest(
+        self, query: str, kind: Optional[str] = None, limit: int = 5
+    ) -> Dict[str, List[str]]:
+        self._ensure_fresh()
+        suggestions = {}
+        with self._lock:
+            if kind in (None, "city"):
+                suggestions["cities"] = self.cities.suggest(query, limit=limit)
+            if kind in (None, "community"):
+                suggestions["communities"] = self.communities.suggest(
+                    query, limit=limit
+                )
+        return suggestions
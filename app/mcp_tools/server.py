@@ -1,17 +1,15 @@
 import os
 
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
-
+from app.change_feed import property_changes, start_listener_thread
 from app.mcp_tools.tools import mcp
-from app.models import Base
 
-load_dotenv()
-database_url = os.getenv("DATABASE_URL")
-engine_sync = create_engine(database_url)
+# The schema is created once by ``python -m app.db`` / ``seed_db.py``, not on
+# every launch of this process. The place index loads on the first lookup
+# that needs it, so a session that never filters by place never scans for
+# the distinct names.
 
 if __name__ == "__main__":
-    Base.metadata.create_all(bind=engine_sync)
+    start_listener_thread(property_changes, os.getenv("DATABASE_URL"))
 
     print("✅ MCP server has started on http://127.0.0.1:5005")
 
@@ -1,12 +1,17 @@
 import os
+import re
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Union
 
 from dotenv import load_dotenv
 from mcp.server.fastmcp import FastMCP
 from sqlalchemy import create_engine, func, text
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
+from app.cache import cached, get_cache
+from app.change_feed import PropertyChange, property_changes
+from app.mcp_tools.places import PlaceIndex
+from app.routing import ReadRouter, split_urls
 from app.utils import format_property_details
 
 load_dotenv()
@@ -15,11 +20,125 @@ mcp = FastMCP(
     "Real Estate MCP",
 )
 
-engine_sync = create_engine(os.getenv("DATABASE_URL"))
+engine_sync = create_engine(os.getenv("DATABASE_URL"), pool_pre_ping=True)
 SessionLocal = sessionmaker(bind=engine_sync)
 
+# Tool queries are read-only and go through the replica router; the place
+# index reads from the primary so it never reloads behind the change feed.
+# Interactive reads on the primary share engine_sync's pool.
+read_router = ReadRouter(
+    os.getenv("DATABASE_URL"),
+    split_urls(os.getenv("READ_REPLICA_URLS")),
+    primary_engine=engine_sync,
+)
+
+
+def read_session(workload: str = "interactive") -> Session:
+    """
+    Session on a read replica (or the primary) sized for ``workload``.
+
+    Tool results are cached, so these are ``fresh`` reads: they go to the
+    primary while replicas may still be behind the last invalidation.
+    """
+    return Session(bind=read_router.engine(workload, fresh=True))
+
+
+def _load_places() -> Tuple[List[str], List[str]]:
+    """
+    Fetch the city and community names for the place index, most listed
+    first, so the most common spelling of a name is the one suggested.
+    """
+    session = SessionLocal()
+    try:
+        rows = session.execute(
+            text("SELECT kind, name FROM property_places ORDER BY listings DESC, name")
+        ).all()
+    finally:
+        session.close()
+    cities = [name for kind, name in rows if kind == "city"]
+    communities = [name for kind, name in rows if kind == "community"]
+    return cities, communities
+
+
+places = PlaceIndex(_load_places, ttl=float(os.getenv("PLACE_INDEX_TTL", "300")))
+
+# Matches ranked per text-search query. A common word ("towers", "near") can
+# match most listings, and ranking all of them takes seconds at 1M rows.
+TEXT_SEARCH_CANDIDATES = int(os.getenv("TEXT_SEARCH_CANDIDATES", "1000"))
+
+
+def _apply_place_change(change: PropertyChange) -> None:
+    """
+    Keep the place index in step with the properties table. Reloading reads
+    one row per distinct name, so any change to the names just drops it.
+    """
+    if change.place_changed:
+        places.invalidate()
+
+
+property_changes.subscribe(_apply_place_change)
+
+# Results of the read-only tools, dropped once per batch of listing changes.
+# run_agent starts a new stdio server for every chat request, so the default
+# per-process cache only serves repeated calls within one agent run; set
+# CACHE_URL to share results across requests and with other workers.
+tool_cache = get_cache("tools")
+
+
+def _invalidate_tool_cache(changes: List[PropertyChange]) -> None:
+    read_router.pin_primary()
+    tool_cache.clear()
+
+
+property_changes.subscribe_batch(_invalidate_tool_cache)
+
+
+def _place_match(column: str, value: str) -> Tuple[str, dict]:
+    """
+    Build the clause and bind params for a city or community filter.
+
+    Input the place index can canonicalize becomes an IN over every stored
+    spelling of that name, on the indexed column; anything else falls back
+    to a substring ILIKE.
+    """
+    resolve = places.resolve_city if column == "city" else places.resolve_community
+    spellings = resolve(value)
+    if spellings:
+        params = {f"{column}_{i}": name for i, name in enumerate(spellings)}
+        placeholders = ", ".join(f":{name}" for name in params)
+        return f"{column} IN ({placeholders})", params
+    return f"{column} ILIKE :{column}", {column: f"%{value}%"}
+
+
+def _property_filters(
+        city: Optional[str] = None,
+        bhk: Optional[int] = None,
+        max_price: Optional[int] = None,
+        min_price: Optional[int] = None,
+) -> Tuple[str, dict]:
+    """Build the optional AND clauses and bind params shared by the search tools."""
+    query = ""
+    params = {}
+
+    if city:
+        clause, place_params = _place_match("city", city)
+        query += f" AND {clause}"
+        params.update(place_params)
+    if bhk is not None:
+        query += " AND no_of_bedrooms = :bhk"
+        params["bhk"] = bhk
+    if max_price is not None:
+        query += " AND asking_price <= :max_price"
+        params["max_price"] = max_price
+    if min_price is not None:
+        query += " AND asking_price >= :min_price"
+        params["min_price"] = min_price
+
+    return query, params
+
 
 @mcp.tool()
+@cached(tool_cache)
 def search_properties(
         city: Optional[str] = None,
         bhk: Optional[int] = None,
@@ -40,7 +159,7 @@ def search_properties(
     Returns:
         dict: Detailed property information including all available fields
     """
-    session = SessionLocal()
+    session = read_session()
     try:
         query = """
         SELECT id, no_of_bedrooms, no_of_bathrooms, carpet_area, total_area,
@@ -48,20 +167,8 @@ def search_properties(
         FROM properties
         WHERE 1=1
         """
-        params = {}
-
-        if city:
-            query += " AND city ILIKE :city"
-            params["city"] = f"%{city}%"
-        if bhk is not None:
-            query += " AND no_of_bedrooms = :bhk"
-            params["bhk"] = bhk
-        if max_price is not None:
-            query += " AND asking_price <= :max_price"
-            params["max_price"] = max_price
-        if min_price is not None:
-            query += " AND asking_price >= :min_price"
-            params["min_price"] = min_price
+        filters, params = _property_filters(city, bhk, max_price, min_price)
+        query += filters
 
         query += " LIMIT :limit"
         params["limit"] = limit
@@ -84,7 +191,136 @@ def search_properties(
     }
 
 
+def _text_search_queries(words: List[str]) -> List[str]:
+    """
+    The tsqueries to try in turn, from listings matching every word, through
+    those missing any one word, to those matching at least one.
+    """
+    terms = [f"{word}:*" for word in words]
+    queries = [" & ".join(terms)]
+    if len(terms) > 2:
+        queries.append(
+            " | ".join(
+                "(" + " & ".join(terms[:i] + terms[i + 1:]) + ")"
+                for i in range(len(terms))
+            )
+        )
+    if len(terms) > 1:
+        queries.append(" | ".join(terms))
+    return queries
+
+
+@mcp.tool()
+@cached(tool_cache)
+def search_properties_text(
+        query: str,
+        city: Optional[str] = None,
+        bhk: Optional[int] = None,
+        max_price: Optional[int] = None,
+        min_price: Optional[int] = None,
+        limit: int = 10,
+) -> dict:
+    """
+    Ranked free-text search over building names, communities and cities.
+
+    Use this for queries such as "Prestige towers near Whitefield". Each word
+    is matched as a prefix. Properties matching every word come back first,
+    then, if there are too few, those missing one word, then those matching
+    any of the words.
+
+    Args:
+        query (str): Free-text search terms.
+        city (str, optional): City name to filter by.
+        bhk (int, optional): Number of bedrooms to filter by.
+        max_price (int, optional): Maximum price to filter by.
+        min_price (int, optional): Minimum price to filter by.
+        limit (int, optional): Maximum number of results to return (default: 10).
+
+    Returns:
+        dict: The top matching properties, best match first
+    """
+    words = list(dict.fromkeys(re.findall(r"\w+", query.lower())))
+    if not words:
+        return {"message": "Please provide some search terms", "data": []}
+
+    session = read_session()
+    try:
+        filters, params = _property_filters(city, bhk, max_price, min_price)
+        sql = f"""
+        SELECT id, no_of_bedrooms, no_of_bathrooms, carpet_area, total_area,
+               country, state, city, community, building_name, asking_price,
+               ts_rank_cd(search_document, search_query) AS rank
+        FROM (
+            SELECT id, no_of_bedrooms, no_of_bathrooms, carpet_area, total_area,
+                   country, state, city, community, building_name, asking_price,
+                   search_document
+            FROM properties
+            WHERE search_document @@ to_tsquery('english', :search_query)
+              AND id <> ALL(:seen) {filters}
+            LIMIT :candidates
+        ) AS candidates, to_tsquery('english', :search_query) AS search_query
+        ORDER BY rank DESC, id
+        LIMIT :limit
+        """
+        params["candidates"] = max(TEXT_SEARCH_CANDIDATES, limit)
+
+        results = []
+        for search_query in _text_search_queries(words):
+            params["search_query"] = search_query
+            params["seen"] = [row["id"] for row in results]
+            params["limit"] = limit - len(results)
+            result = session.execute(text(sql), params)
+            results += [dict(row) for row in result.mappings().all()]
+            if len(results) >= limit:
+                break
+        formatted_results = format_property_details(results)
+    finally:
+        session.close()
+
+    if not results:
+        return {
+            "message": f"No properties matched '{query}'",
+            "data": [],
+        }
+
+    return {
+        "message": f"{len(results)} Properties matched '{query}'",
+        "data": formatted_results,
+    }
+
+
+@mcp.tool()
+def suggest_places(
+        query: str,
+        kind: Optional[str] = None,
+        limit: int = 5,
+) -> dict:
+    """
+    Suggest city and community names matching partial or misspelled input.
+
+    Use this to find the exact spelling of a place before searching, e.g.
+    "hydrabad" or "koramangla".
+
+    Args:
+        query: Partial or misspelled place name
+        kind: Optional 'city' or 'community' to restrict suggestions
+        limit: Maximum number of suggestions per kind (default: 5)
+
+    Returns:
+        dict: Suggested city and community names, best match first
+    """
+    if kind not in (None, "city", "community"):
+        return {"message": "kind must be 'city' or 'community'", "data": {}}
+
+    suggestions = places.suggest(query, kind=kind, limit=limit)
+    return {
+        "message": f"Suggestions for '{query}'",
+        "data": suggestions,
+    }
+
+
 @mcp.tool()
+@cached(tool_cache)
 def get_property_details(property_id: int) -> dict:
     """
     Get detailed information about a specific property by its ID.
@@ -95,10 +331,12 @@ def get_property_details(property_id: int) -> dict:
     Returns:
         dict: Detailed property information including all available fields
     """
-    session = SessionLocal()
+    session = read_session()
     try:
         query = """
-        SELECT *
+        SELECT id, no_of_bedrooms, no_of_bathrooms, carpet_area, total_area,
+               country, state, city, community, building_name, asking_price,
+               updated_at, version
         FROM properties
         WHERE id = :property_id
         """
@@ -117,6 +355,7 @@ def get_property_details(property_id: int) -> dict:
 
 
 @mcp.tool()
+@cached(tool_cache)
 def compare_properties(property_ids: List[int]) -> dict:
     """
     Compare multiple properties side by side.
@@ -130,7 +369,7 @@ def compare_properties(property_ids: List[int]) -> dict:
     if len(property_ids) < 2:
         return {"message": "Please provide at least 2 property IDs to compare", "data": []}
 
-    session = SessionLocal()
+    session = read_session()
     try:
         placeholders = ", ".join([":id_" + str(i) for i in range(len(property_ids))])
         params = {"id_" + str(i): pid for i, pid in enumerate(property_ids)}
@@ -157,6 +396,7 @@ def compare_properties(property_ids: List[int]) -> dict:
 
 
 @mcp.tool()
+@cached(tool_cache)
 def get_price_trends(
         city: str,
         days: int = 30,
@@ -173,7 +413,7 @@ def get_price_trends(
     Returns:
         dict: Price trend data
     """
-    session = SessionLocal()
+    session = read_session("analytics")
     try:
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
@@ -183,12 +423,10 @@ def get_price_trends(
             AVG(asking_price) as avg_price,
             COUNT(*) as property_count
         FROM properties
-        WHERE city ILIKE :city
         """
 
-        params = {
-            "city": f"%{city}%",
-        }
+        clause, params = _place_match("city", city)
+        query += f" WHERE {clause}"
 
         if property_type:
             query += " AND property_type = :property_type"
@@ -207,6 +445,7 @@ def get_price_trends(
 
 
 @mcp.tool()
+@cached(tool_cache)
 def get_similar_properties(
         property_id: int,
         limit: int = 5
@@ -221,7 +460,7 @@ def get_similar_properties(
     Returns:
         dict: List of similar properties
     """
-    session = SessionLocal()
+    session = read_session("analytics")
     try:
         # First, get the reference property details
         ref_query = """
@@ -238,7 +477,8 @@ def get_similar_properties(
 
         # Find similar properties
         similar_query = """
-        SELECT *,
+        SELECT id, no_of_bedrooms, no_of_bathrooms, carpet_area, total_area,
+               country, state, city, community, building_name, asking_price,
                ABS(no_of_bedrooms - :ref_bhk) as bhk_diff,
                ABS(asking_price - :ref_price) / NULLIF(:ref_price, 0) * 100 as price_diff_pct
         FROM properties
@@ -271,6 +511,7 @@ def get_similar_properties(
 
 
 @mcp.tool()
+@cached(tool_cache)
 def get_community_stats(
         community: str,
         city: Optional[str] = None
@@ -285,7 +526,7 @@ def get_community_stats(
     Returns:
         dict: Community statistics including average prices, property types, etc.
     """
-    session = SessionLocal()
+    session = read_session("analytics")
     try:
         query = """
         SELECT 
@@ -298,14 +539,15 @@ def get_community_stats(
             property_type,
             COUNT(*) as count_by_type
         FROM properties
-        WHERE community ILIKE :community
         """
 
-        params = {"community": f"%{community}%"}
+        clause, params = _place_match("community", community)
+        query += f" WHERE {clause}"
 
         if city:
-            query += " AND city ILIKE :city"
-            params["city"] = f"%{city}%"
+            clause, place_params = _place_match("city", city)
+            query += f" AND {clause}"
+            params.update(place_params)
 
         query += """
         GROUP BY property_type
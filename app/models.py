@@ -1,10 +1,40 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import (
+    DDL,
+    Column,
+    Computed,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    event,
+    func,
+    inspect,
+    text,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateColumn, CreateIndex
 
+from app.change_feed import PROPERTY_CHANGE_DDL
 from app.db import Base
 
+# Text-search document over the name fields, stored in the search_document
+# column so ranking reads it instead of re-parsing the names of every match.
+SEARCH_DOCUMENT = (
+    "to_tsvector('english', coalesce(building_name, '') || ' ' || "
+    "coalesce(community, '') || ' ' || city)"
+)
+
 
 class Property(Base):
     __tablename__ = "properties"
+    __table_args__ = (
+        Index(
+            "ix_properties_search_document",
+            "search_document",
+            postgresql_using="gin",
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     no_of_bedrooms = Column(Integer, nullable=False)
@@ -14,6 +44,149 @@ class Property(Base):
     country = Column(String, nullable=False)
     state = Column(String, nullable=False)
     city = Column(String, nullable=False, index=True)
-    community = Column(String, nullable=True)
+    community = Column(String, nullable=True, index=True)
     building_name = Column(String, nullable=True)
     asking_price = Column(Integer, nullable=False)
+    # Maintained by the touch_property trigger, see app.change_feed.
+    updated_at = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+    version = Column(Integer, nullable=False, server_default=text("1"))
+    search_document = Column(
+        TSVECTOR, Computed(SEARCH_DOCUMENT, persisted=True), nullable=False
+    )
+
+
+class PropertyPlace(Base):
+    """
+    Listing count per distinct city and community spelling.
+
+    Maintained by the count_property_places triggers, so the MCP place index
+    loads a few hundred rows instead of scanning the properties table.
+    """
+
+    __tablename__ = "property_places"
+
+    kind = Column(String, primary_key=True)  # 'city' or 'community'
+    name = Column(String, primary_key=True)
+    listings = Column(Integer, nullable=False)
+
+
+# Statement-level triggers keeping property_places in step with properties:
+# one upsert per distinct name a statement touches, not one per row. Names
+# are locked in a fixed order so concurrent writers cannot deadlock.
+# Transition tables are only allowed on single-event triggers, hence three,
+# and each branch may only read the tables its event provides.
+PROPERTY_PLACES_DDL = [
+    DDL("""
+        CREATE OR REPLACE FUNCTION count_property_places() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO property_places AS places (kind, name, listings)
+                SELECT kind, name, sum(delta) FROM (
+                    SELECT 'city' AS kind, city AS name, 1 AS delta FROM new_rows
+                    UNION ALL
+                    SELECT 'community', community, 1 FROM new_rows
+                    WHERE community IS NOT NULL
+                ) AS deltas
+                GROUP BY kind, name
+                ORDER BY kind, name
+                ON CONFLICT (kind, name)
+                DO UPDATE SET listings = places.listings + EXCLUDED.listings;
+            ELSIF TG_OP = 'UPDATE' THEN
+                INSERT INTO property_places AS places (kind, name, listings)
+                SELECT kind, name, sum(delta) FROM (
+                    SELECT 'city' AS kind, city AS name, 1 AS delta FROM new_rows
+                    UNION ALL
+                    SELECT 'community', community, 1 FROM new_rows
+                    WHERE community IS NOT NULL
+                    UNION ALL
+                    SELECT 'city', city, -1 FROM old_rows
+                    UNION ALL
+                    SELECT 'community', community, -1 FROM old_rows
+                    WHERE community IS NOT NULL
+                ) AS deltas
+                GROUP BY kind, name
+                HAVING sum(delta) <> 0
+                ORDER BY kind, name
+                ON CONFLICT (kind, name)
+                DO UPDATE SET listings = places.listings + EXCLUDED.listings;
+            ELSE
+                INSERT INTO property_places AS places (kind, name, listings)
+                SELECT kind, name, sum(delta) FROM (
+                    SELECT 'city' AS kind, city AS name, -1 AS delta FROM old_rows
+                    UNION ALL
+                    SELECT 'community', community, -1 FROM old_rows
+                    WHERE community IS NOT NULL
+                ) AS deltas
+                GROUP BY kind, name
+                ORDER BY kind, name
+                ON CONFLICT (kind, name)
+                DO UPDATE SET listings = places.listings + EXCLUDED.listings;
+            END IF;
+            DELETE FROM property_places WHERE listings <= 0;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """),
+    *(
+        DDL(f"""
+            CREATE OR REPLACE TRIGGER count_property_places_{op.lower()}
+            AFTER {op} ON properties
+            REFERENCING {tables}
+            FOR EACH STATEMENT EXECUTE FUNCTION count_property_places()
+            """)
+        for op, tables in [
+            ("INSERT", "NEW TABLE AS new_rows"),
+            ("UPDATE", "NEW TABLE AS new_rows OLD TABLE AS old_rows"),
+            ("DELETE", "OLD TABLE AS old_rows"),
+        ]
+    ),
+]
+
+# Fills property_places from the listings already in the database when the
+# table is added to an existing schema.
+BACKFILL_PROPERTY_PLACES = DDL("""
+    INSERT INTO property_places (kind, name, listings)
+    SELECT 'city', city, count(*) FROM properties GROUP BY city
+    UNION ALL
+    SELECT 'community', community, count(*) FROM properties
+    WHERE community IS NOT NULL GROUP BY community
+    ON CONFLICT DO NOTHING
+    """)
+
+event.listen(
+    PropertyPlace.__table__,
+    "after_create",
+    BACKFILL_PROPERTY_PLACES.execute_if(dialect="postgresql"),
+)
+
+
+def create_schema(connection: Connection) -> None:
+    """
+    Create any missing tables and bring an existing schema up to date.
+
+    Safe to run repeatedly. Columns and indexes that an existing properties
+    table lacks are added, and the triggers are (re)installed. Adding
+    search_document rewrites the table, so the first upgrade of a large
+    table blocks writes until it commits.
+    """
+    table = Property.__table__
+    inspector = inspect(connection)
+    if inspector.has_table(table.name):
+        # No writes may slip between the backfill of property_places and the
+        # triggers that keep it and the change feed current.
+        connection.execute(text(f"LOCK TABLE {table.name} IN SHARE ROW EXCLUSIVE MODE"))
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                column_ddl = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.execute(
+                    text(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}")
+                )
+        for index in table.indexes:
+            connection.execute(CreateIndex(index, if_not_exists=True))
+
+    Base.metadata.create_all(connection)
+    for ddl in PROPERTY_CHANGE_DDL + PROPERTY_PLACES_DDL:
+        connection.execute(ddl)
@@ -0,0 +1,356 @@
+import json
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+
+import tiktoken
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+logger = logging.getLogger(__name__)
+
+MAX_PROMPT_TOKENS = int(os.getenv("MAX_PROMPT_TOKENS", "8000"))
+OLD_TOOL_RESULT_CHARS = int(os.getenv("OLD_TOOL_RESULT_CHARS", "500"))
+# How many of the latest user messages are matched against TOOL_INTENTS.
+INTENT_TURNS = int(os.getenv("INTENT_TURNS", "3"))
+
+# Tools offered on every request; the rest are only bound when a recent user
+# message looks like it needs them, or the conversation has already used them.
+CORE_TOOLS = {
+    "search_properties",
+    "search_properties_text",
+    "suggest_places",
+    "get_property_details",
+}
+TOOL_INTENTS = {
+    "compare_properties": re.compile(r"\bcompar|\bvs\b|\bversus\b|\bdifference", re.I),
+    "get_price_trends": re.compile(
+        r"\btrend|\baverage\b|\bavg\b|\bprice history|\bmarket", re.I
+    ),
+    "get_community_stats": re.compile(
+        r"\bcommunit|\bneighbou?rhood|\blocality|\bstats\b|\bstatistic", re.I
+    ),
+    "get_similar_properties": re.compile(
+        r"\bsimilar|\balternative|\blike this|\bcomparable", re.I
+    ),
+}
+
+
+# An argument line of a Google-style "Args:" section:
+# "name (type, optional): description" or "name: description".
+ARG_LINE = re.compile(r"^(\w+)\s*(?:\([^)]*\))?\s*:\s*(.*)$")
+SECTION_HEADER = re.compile(r"^[A-Z]\w*:$")
+
+
+class PromptBudgetExceeded(Exception):
+    """The prompt cannot be brought under the token ceiling."""
+
+
+@lru_cache(maxsize=8)
+def get_encoding(model_name: str) -> Optional[tiktoken.Encoding]:
+    """
+    The tiktoken encoding for ``model_name``, or None if it cannot be loaded.
+
+    tiktoken downloads its BPE files on first use; if that fails, token counts
+    fall back to an estimate rather than failing the chat request.
+    """
+    try:
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        logger.exception("Could not load tiktoken encoding, estimating token counts")
+        return None
+
+
+def select_tools(
+    tools: Sequence[BaseTool],
+    messages: Sequence[BaseMessage],
+    turns: int = INTENT_TURNS,
+) -> List[BaseTool]:
+    """
+    Keep the core tools, the tools already called in ``messages``, and any
+    whose intent pattern matches one of the last ``turns`` user messages.
+
+    Follow-ups such as "and the second one?" carry no intent of their own, so
+    the tools of earlier turns stay bound.
+    """
+    wanted = set(CORE_TOOLS)
+    recent = [m.content for m in messages if isinstance(m, HumanMessage)][-turns:]
+    for message in messages:
+        if isinstance(message, AIMessage):
+            wanted.update(call["name"] for call in message.tool_calls)
+        elif isinstance(message, ToolMessage) and message.name:
+            wanted.add(message.name)
+    for name, pattern in TOOL_INTENTS.items():
+        if any(isinstance(text, str) and pattern.search(text) for text in recent):
+            wanted.add(name)
+    return [tool for tool in tools if tool.name in wanted]
+
+
+def compact_schema(schema: Any) -> Any:
+    """
+    Strip a JSON schema down to what the model needs to build a call.
+
+    Drops titles and null defaults, and collapses ``Optional[X]``
+    (``anyOf: [X, null]``) to ``X``; optional arguments are already implied
+    by their absence from ``required``.
+    """
+    if isinstance(schema, list):
+        return [compact_schema(item) for item in schema]
+    if not isinstance(schema, dict):
+        return schema
+
+    compacted = {}
+    for key, value in schema.items():
+        if key == "title" or (key == "default" and value is None):
+            continue
+        if key == "anyOf":
+            options = [option for option in value if option.get("type") != "null"]
+            if len(options) == 1:
+                compacted.update(compact_schema(options[0]))
+                continue
+        if key == "properties":
+            # Argument names, not schema keywords: an argument may be called "title".
+            compacted[key] = {
+                name: compact_schema(prop) for name, prop in value.items()
+            }
+        else:
+            compacted[key] = compact_schema(value)
+    return compacted
+
+
+def arg_descriptions(docstring: str) -> Dict[str, str]:
+    """Per-argument descriptions from the ``Args:`` section of a docstring."""
+    descriptions: Dict[str, str] = {}
+    current = None
+    in_args = False
+    for line in docstring.splitlines():
+        line = line.strip()
+        if line == "Args:":
+            in_args = True
+        elif not in_args or not line:
+            continue
+        elif SECTION_HEADER.match(line):
+            break
+        elif ARG_LINE.match(line):
+            current, description = ARG_LINE.match(line).groups()
+            descriptions[current] = description
+        elif current:
+            descriptions[current] += " " + line
+    return descriptions
+
+
+def tool_summary(docstring: str) -> str:
+    """
+    The paragraphs of a docstring before its first section (``Args:``,
+    ``Returns:``), each collapsed onto one line.
+
+    Usage guidance written after the summary line, such as when to call
+    ``suggest_places``, is kept.
+    """
+    paragraphs, current = [], []
+    for line in docstring.strip().splitlines():
+        line = line.strip()
+        if SECTION_HEADER.match(line):
+            break
+        if line:
+            current.append(line)
+        elif current:
+            paragraphs.append(" ".join(current))
+            current = []
+    if current:
+        paragraphs.append(" ".join(current))
+    return "\n\n".join(paragraphs)
+
+
+def compact_tool(tool: BaseTool) -> BaseTool:
+    """
+    Copy of ``tool`` with its description cut to ``tool_summary()`` and a
+    compacted schema.
+
+    The ``Args:`` section is dropped from the description, so each argument's
+    line from it moves into the schema, where the model still sees what
+    values such as ``kind`` or ``days`` mean.
+    """
+    description = tool.description or ""
+    update = {"description": tool_summary(description)}
+    if isinstance(tool.args_schema, dict):
+        schema = compact_schema(tool.args_schema)
+        properties = schema.get("properties", {})
+        for name, text in arg_descriptions(description).items():
+            if name in properties and "description" not in properties[name]:
+                properties[name]["description"] = text.rstrip(".")
+        update["args_schema"] = schema
+    return tool.model_copy(update=update)
+
+
+def truncate_tool_message(message: ToolMessage, max_chars: int) -> ToolMessage:
+    content = message.content
+    if not isinstance(content, str) or len(content) <= max_chars:
+        return message
+    dropped = len(content) - max_chars
+    return message.model_copy(
+        update={"content": f"{content[:max_chars]}... [{dropped} characters truncated]"}
+    )
+
+
+class PromptBudget:
+    """
+    Keeps each LLM call of an agent run under a token ceiling.
+
+    ``prepare_tools()`` picks and compacts the tools to bind, dropping the
+    intent-matched ones if the schemas alone would exceed the ceiling, and
+    ``pre_model_hook`` trims the message history before every model call:
+    tool results older than the latest tool-call round are truncated, then
+    whole conversation turns are dropped, oldest first, then the remaining
+    tool results are cut further until the prompt fits. A prompt that still
+    does not fit raises ``PromptBudgetExceeded`` rather than being sent.
+    Token counts before and after are accumulated for ``report()``.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_tokens: int = MAX_PROMPT_TOKENS,
+        old_tool_result_chars: int = OLD_TOOL_RESULT_CHARS,
+    ):
+        self.encoding = get_encoding(model_name)
+        self.max_tokens = max_tokens
+        self.old_tool_result_chars = old_tool_result_chars
+        self.full_tool_tokens = 0
+        self.tool_tokens = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self.model_calls = 0
+
+    def count_tools(self, tools: Sequence[BaseTool]) -> int:
+        return sum(
+            self.count_text(json.dumps(convert_to_openai_tool(tool))) for tool in tools
+        )
+
+    def count_text(self, text: str) -> int:
+        if self.encoding is None:
+            return len(text) // 4 + 1
+        return len(self.encoding.encode(text))
+
+    def count_messages(self, messages: Sequence[BaseMessage]) -> int:
+        # Roughly OpenAI's chat accounting: a few tokens of framing per message
+        # plus its content and any tool calls, and 3 to prime the reply.
+        total = 3
+        for message in messages:
+            content = message.content
+            if not isinstance(content, str):
+                content = json.dumps(content)
+            total += 4 + self.count_text(content)
+            if isinstance(message, AIMessage) and message.tool_calls:
+                calls = [(call["name"], call["args"]) for call in message.tool_calls]
+                total += self.count_text(json.dumps(calls))
+        return total
+
+    def prepare_tools(
+        self, tools: Sequence[BaseTool], messages: Sequence[BaseMessage]
+    ) -> List[BaseTool]:
+        selected = [compact_tool(tool) for tool in select_tools(tools, messages)]
+        self.full_tool_tokens = self.count_tools(tools)
+        self.tool_tokens = self.count_tools(selected)
+        if self.tool_tokens > self.max_tokens:
+            selected = [tool for tool in selected if tool.name in CORE_TOOLS]
+            self.tool_tokens = self.count_tools(selected)
+        if self.tool_tokens > self.max_tokens:
+            self.over_budget("tool schemas", self.tool_tokens)
+        return selected
+
+    def over_budget(self, what: str, tokens: int) -> None:
+        """Log and raise: the prompt would be sent over the ceiling."""
+        logger.warning(
+            "Prompt budget exceeded: %s need %d tokens, limit is %d",
+            what,
+            tokens,
+            self.max_tokens,
+        )
+        raise PromptBudgetExceeded(
+            f"The {what} need {tokens} tokens, over the {self.max_tokens} token limit"
+        )
+
+    def trim(self, messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+        latest_call = max(
+            (
+                i
+                for i, m in enumerate(messages)
+                if isinstance(m, AIMessage) and m.tool_calls
+            ),
+            default=-1,
+        )
+        trimmed = [
+            (
+                truncate_tool_message(m, self.old_tool_result_chars)
+                if isinstance(m, ToolMessage) and i < latest_call
+                else m
+            )
+            for i, m in enumerate(messages)
+        ]
+
+        budget = self.max_tokens - self.tool_tokens
+        while self.count_messages(trimmed) > budget:
+            start = next(
+                (i for i, m in enumerate(trimmed) if not isinstance(m, SystemMessage)),
+                len(trimmed),
+            )
+            next_turn = next(
+                (
+                    i
+                    for i in range(start + 1, len(trimmed))
+                    if isinstance(trimmed[i], HumanMessage)
+                ),
+                None,
+            )
+            if next_turn is None:
+                break
+            del trimmed[start:next_turn]
+
+        # Only the current turn is left: shorten its tool results as well,
+        # halving the allowance until the prompt fits.
+        remaining = trimmed
+        max_chars = self.old_tool_result_chars
+        while self.count_messages(trimmed) > budget and max_chars >= 50:
+            trimmed = [
+                (
+                    truncate_tool_message(m, max_chars)
+                    if isinstance(m, ToolMessage)
+                    else m
+                )
+                for m in remaining
+            ]
+            max_chars //= 2
+
+        tokens = self.count_messages(trimmed)
+        if tokens > budget:
+            self.over_budget("prompt and tool schemas", tokens + self.tool_tokens)
+        return trimmed
+
+    def pre_model_hook(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        messages = state["messages"]
+        trimmed = self.trim(messages)
+        self.model_calls += 1
+        self.tokens_before += self.full_tool_tokens + self.count_messages(messages)
+        self.tokens_after += self.tool_tokens + self.count_messages(trimmed)
+        return {"llm_input_messages": trimmed}
+
+    def report(self) -> Dict[str, int]:
+        return {
+            "before": self.tokens_before,
+            "after": self.tokens_after,
+            "model_calls": self.model_calls,
+            "limit": self.max_tokens,
+        }
@@ -1,12 +1,42 @@
-from typing import Any, Dict, List
+import asyncio
+from typing import Any, Dict, List, Literal, Optional, Set
 
-from fastapi import APIRouter, HTTPException, status
+import orjson
+import xxhash
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from mcp_client import extract_final_answer, run_agent
+from app.cache import get_cache, make_key
+from app.change_feed import PropertyChange, property_changes
+from app.crud import get_filtered_properties, get_property
+from app.db import get_read_db, read_router
+from app.export import EXPORT_MEDIA_TYPES, export_properties
 
 router = APIRouter()
 
+# Serialized /properties responses, dropped whenever a listing changes.
+property_cache = get_cache("properties")
+_invalidations: Set[asyncio.Task] = set()
+
+
+def invalidate_property_cache(changes: List[PropertyChange]) -> None:
+    """
+    Clear the response cache once per batch of changes.
+
+    Runs on the change-feed listener's event loop, so the clear is scheduled
+    as a task rather than awaited. Reads that refill the cache go to the
+    primary until the replicas have had time to replay the change.
+    """
+    read_router.pin_primary()
+    task = asyncio.get_running_loop().create_task(property_cache.aclear())
+    _invalidations.add(task)
+    task.add_done_callback(_invalidations.discard)
+
+
+property_changes.subscribe_batch(invalidate_property_cache)
+
 
 class ChatMessage(BaseModel):
     role: str = Field(
@@ -47,6 +77,9 @@ async def chat_with_agent(request: ChatRequest):
     Returns:
         JSON response with the agent's reply and updated chat history
     """
+    # Deferred so the API process does not load langchain until the first chat
+    from mcp_client import extract_final_answer, run_agent
+
     try:
         # Format the chat history for the agent
         formatted_messages = [(msg.role, msg.content) for msg in request.chat_history]
@@ -76,6 +109,121 @@ async def chat_with_agent(request: ChatRequest):
         )
 
 
+def etag_response(request: Request, body: bytes) -> Response:
+    """
+    Send a JSON body with an ETag and honour If-None-Match.
+
+    The ETag is a hash of the response body, so an unchanged result is
+    answered with an empty 304 instead of being sent again.
+    """
+    etag = f'"{xxhash.xxh64_hexdigest(body)}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = {
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        }
+        if etag in candidates or "*" in candidates:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/properties/export")
+async def export_property_inventory(
+    format: Literal["ndjson", "arrow"] = Query(
+        "ndjson", description="Export format: 'ndjson' or 'arrow' (Arrow IPC stream)"
+    ),
+    city: Optional[str] = Query(None, description="City name to filter by"),
+    bhk: Optional[int] = Query(None, description="Number of bedrooms to filter by"),
+    min_price: Optional[int] = Query(None, description="Minimum asking price"),
+    max_price: Optional[int] = Query(None, description="Maximum asking price"),
+    batch_size: int = Query(
+        1000, ge=1, le=10000, description="Rows fetched per server-side cursor batch"
+    ),
+):
+    """
+    Stream every matching property as NDJSON or an Arrow IPC stream.
+
+    Rows are read through a server-side cursor and written out batch by batch,
+    so memory use stays constant regardless of the size of the result.
+    """
+    return StreamingResponse(
+        export_properties(
+            fmt=format,
+            city=city,
+            min_price=min_price,
+            max_price=max_price,
+            bhk=bhk,
+            batch_size=batch_size,
+        ),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="properties.{format}"'},
+    )
+
+
+@router.get("/properties")
+async def search_properties(
+    request: Request,
+    city: Optional[str] = Query(None, description="City name to filter by"),
+    bhk: Optional[int] = Query(None, description="Number of bedrooms to filter by"),
+    min_price: Optional[int] = Query(None, description="Minimum asking price"),
+    max_price: Optional[int] = Query(None, description="Maximum asking price"),
+    limit: int = Query(20, ge=1, le=500, description="Maximum number of results"),
+    offset: int = Query(0, ge=0, description="Number of results to skip"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Search properties by city, bedrooms and price.
+
+    The filters are those of the MCP search tool, except that ``city`` is
+    matched as a case-insensitive substring rather than resolved through the
+    place index; see ``build_property_filters``.
+
+    Responses carry an ETag; send it back in If-None-Match to get a 304 when
+    the result has not changed.
+    """
+    key = make_key("search", city, bhk, min_price, max_price, limit, offset)
+    generation, body = await property_cache.alookup(key)
+    if body is None:
+        properties = await get_filtered_properties(
+            db,
+            city=city,
+            min_price=min_price,
+            max_price=max_price,
+            bhk=bhk,
+            limit=limit,
+            offset=offset,
+        )
+        body = orjson.dumps({"count": len(properties), "data": properties})
+        if generation is not None:
+            await property_cache.aset(key, body, generation=generation)
+    return etag_response(request, body)
+
+
+@router.get("/properties/{property_id}")
+async def get_property_by_id(
+    request: Request,
+    property_id: int,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Get a single property by its ID."""
+    key = make_key("property", property_id)
+    generation, body = await property_cache.alookup(key)
+    if body is None:
+        prop = await get_property(db, property_id)
+        if prop is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Property {property_id} not found",
+            )
+        body = orjson.dumps(prop)
+        if generation is not None:
+            await property_cache.aset(key, body, generation=generation)
+    return etag_response(request, body)
+
+
 @router.get("/", status_code=status.HTTP_200_OK)
 async def health_check():
     """Health check endpoint to verify the API is running."""
@@ -0,0 +1,234 @@
+import asyncio
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+logger = logging.getLogger(__name__)
+
+# Separate pools per workload, so slow analytics queries cannot take all of
+# the connections that interactive lookups need.
+WORKLOAD_POOLS = {
+    "interactive": {
+        "pool_size": int(os.getenv("INTERACTIVE_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("INTERACTIVE_MAX_OVERFLOW", "20")),
+    },
+    "analytics": {
+        "pool_size": int(os.getenv("ANALYTICS_POOL_SIZE", "2")),
+        "max_overflow": int(os.getenv("ANALYTICS_MAX_OVERFLOW", "2")),
+    },
+}
+REPLICA_BALANCING = os.getenv("REPLICA_BALANCING", "round_robin")
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", "10"))
+# Bounds how long a dead or blackholed server can hold up a connect or probe.
+REPLICA_CONNECT_TIMEOUT = float(os.getenv("REPLICA_CONNECT_TIMEOUT", "3"))
+
+# Seconds the replica is behind the primary. A replica that has replayed
+# everything it received reports 0 even if the primary has been idle, and a
+# server that is not in recovery at all (a primary standing in as a replica)
+# always reports 0.
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """)
+
+
+def split_urls(urls: Optional[str]) -> List[str]:
+    """Parse a comma-separated list of database URLs from the environment."""
+    return [url.strip() for url in (urls or "").split(",") if url.strip()]
+
+
+class DatabaseTarget:
+    """One database server with an engine per workload and its last known lag."""
+
+    def __init__(self, url: str, engines: Dict):
+        self.url = url
+        self.name = make_url(url).render_as_string(hide_password=True)
+        self.engines = engines
+        self.lag: Optional[float] = None
+        self.checked_at: Optional[float] = None
+
+    @property
+    def healthy(self) -> bool:
+        return self.lag is not None and self.lag <= REPLICA_MAX_LAG_SECONDS
+
+
+class BaseReadRouter:
+    """
+    Picks the engine for a read query.
+
+    Reads go to a healthy replica, chosen round-robin or by fewest checked-out
+    connections (``REPLICA_BALANCING=least_connections``). A replica is healthy
+    while its last lag check succeeded and was within
+    ``REPLICA_MAX_LAG_SECONDS``; with no healthy replica, or none configured,
+    reads fall back to the primary. Lag checks run in the background, so a
+    slow replica never holds up the read that found its check due.
+
+    After ``pin_primary()``, typically called when the change feed invalidates
+    a cache, ``fresh`` reads go to the primary for as long as a healthy
+    replica may still be behind, so they do not refill the cache with the
+    data that was just invalidated. Subclasses supply the engine factory and
+    the lag probe.
+
+    Pass the process's existing primary engine as ``primary_engine`` to have
+    interactive reads on the primary share its pool instead of opening another.
+    """
+
+    engine_factory = staticmethod(create_engine)
+    connect_args: Dict = {}
+
+    def __init__(
+        self,
+        primary_url: str,
+        replica_urls: List[str] = (),
+        balancing: str = REPLICA_BALANCING,
+        check_interval: float = REPLICA_LAG_CHECK_INTERVAL,
+        primary_engine=None,
+    ):
+        if balancing not in ("round_robin", "least_connections"):
+            raise ValueError(f"Unknown replica balancing strategy: {balancing}")
+        self.balancing = balancing
+        self.check_interval = check_interval
+        self.primary = DatabaseTarget(
+            primary_url, self._create_engines(primary_url, primary_engine)
+        )
+        self.replicas = [
+            DatabaseTarget(url, self._create_engines(url)) for url in replica_urls
+        ]
+        self._round_robin = itertools.count()
+        self.primary_until = 0.0
+
+    def _create_engines(self, url: str, interactive=None) -> Dict:
+        return {
+            workload: (
+                interactive
+                if workload == "interactive" and interactive is not None
+                else self.engine_factory(
+                    url, pool_pre_ping=True, connect_args=self.connect_args, **pool
+                )
+            )
+            for workload, pool in WORKLOAD_POOLS.items()
+        }
+
+    def pin_primary(self, seconds: float = REPLICA_MAX_LAG_SECONDS) -> None:
+        """Send ``fresh`` reads to the primary for the next ``seconds``."""
+        self.primary_until = max(self.primary_until, time.monotonic() + seconds)
+
+    def _due_for_check(self) -> List[DatabaseTarget]:
+        now = time.monotonic()
+        due = [
+            replica
+            for replica in self.replicas
+            if replica.checked_at is None
+            or now - replica.checked_at > self.check_interval
+        ]
+        # Claim the check up front so concurrent callers do not repeat it.
+        for replica in due:
+            replica.checked_at = now
+        return due
+
+    def _record_lag(self, replica: DatabaseTarget, lag: Optional[float]) -> None:
+        was_healthy = replica.healthy
+        replica.lag = lag
+        if was_healthy and not replica.healthy:
+            logger.warning(
+                "Replica %s taken out of rotation (lag: %s)", replica.name, lag
+            )
+        elif replica.healthy and not was_healthy:
+            logger.info("Replica %s in rotation (lag: %.2fs)", replica.name, lag)
+
+    def _choose(self, workload: str, fresh: bool):
+        if workload not in WORKLOAD_POOLS:
+            raise ValueError(f"Unknown workload: {workload}")
+
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy or (fresh and time.monotonic() < self.primary_until):
+            return self.primary.engines[workload]
+
+        if self.balancing == "least_connections":
+            target = min(
+                healthy, key=lambda replica: replica.engines[workload].pool.checkedout()
+            )
+        else:
+            target = healthy[next(self._round_robin) % len(healthy)]
+        return target.engines[workload]
+
+
+class ReadRouter(BaseReadRouter):
+    """Read routing for synchronous engines, used by the MCP tools."""
+
+    connect_args = {"connect_timeout": max(1, round(REPLICA_CONNECT_TIMEOUT))}
+
+    def engine(self, workload: str = "interactive", fresh: bool = False):
+        for replica in self._due_for_check():
+            threading.Thread(
+                target=self._check, args=(replica,), name="replica-lag", daemon=True
+            ).start()
+        return self._choose(workload, fresh)
+
+    def _check(self, replica: DatabaseTarget) -> None:
+        self._record_lag(replica, self._probe(replica))
+
+    def _probe(self, replica: DatabaseTarget) -> Optional[float]:
+        try:
+            with replica.engines["interactive"].connect() as conn:
+                return float(conn.scalar(REPLICA_LAG_SQL))
+        except Exception:
+            logger.exception("Lag check failed for replica %s", replica.name)
+            return None
+
+    def dispose(self) -> None:
+        for target in [self.primary, *self.replicas]:
+            for engine in target.engines.values():
+                engine.dispose()
+
+
+class AsyncReadRouter(BaseReadRouter):
+    """Read routing for asyncio engines, used by the API."""
+
+    engine_factory = staticmethod(create_async_engine)
+    connect_args = {"timeout": REPLICA_CONNECT_TIMEOUT}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._checks: Set[asyncio.Task] = set()
+
+    async def engine(self, workload: str = "interactive", fresh: bool = False):
+        for replica in self._due_for_check():
+            task = asyncio.get_running_loop().create_task(self._check(replica))
+            self._checks.add(task)
+            task.add_done_callback(self._checks.discard)
+        return self._choose(workload, fresh)
+
+    async def _check(self, replica: DatabaseTarget) -> None:
+        self._record_lag(replica, await self._probe(replica))
+
+    async def _probe(self, replica: DatabaseTarget) -> Optional[float]:
+        try:
+            return await asyncio.wait_for(
+                self._query_lag(replica), timeout=REPLICA_CONNECT_TIMEOUT * 2
+            )
+        except Exception:
+            logger.exception("Lag check failed for replica %s", replica.name)
+            return None
+
+    async def _query_lag(self, replica: DatabaseTarget) -> float:
+        async with replica.engines["interactive"].connect() as conn:
+            return float(await conn.scalar(REPLICA_LAG_SQL))
+
+    async def dispose(self) -> None:
+        for task in list(self._checks):
+            task.cancel()
+        for target in [self.primary, *self.replicas]:
+            for engine in target.engines.values():
+                await engine.dispose()
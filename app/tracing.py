@@ -0,0 +1,238 @@
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+import orjson
+import zstandard
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    BaseMessage,
+    message_to_dict,
+    messages_from_dict,
+)
+from langchain_core.outputs import ChatGeneration, ChatResult, LLMResult
+
+# When set, every agent run is recorded to a trace file in this directory.
+AGENT_TRACE_DIR = os.getenv("AGENT_TRACE_DIR")
+TRACE_VERSION = 1
+
+
+class TraceRecorder(AsyncCallbackHandler):
+    """
+    Records one agent run: the request messages, and every LLM response and
+    tool call with its arguments, result and timing.
+
+    Only LLM *outputs* are stored; each call's input is the request plus the
+    events before it, so it can be rebuilt without storing the history once
+    per call.
+    """
+
+    def __init__(self, messages: List[Any], model_name: str):
+        self.started = time.perf_counter()
+        self.trace: Dict[str, Any] = {
+            "version": TRACE_VERSION,
+            "id": uuid.uuid4().hex,
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "model": model_name,
+            "messages": messages,
+            "events": [],
+            "duration": None,
+            "error": None,
+        }
+        self._open: Dict[UUID, Dict[str, Any]] = {}
+
+    def start(self) -> None:
+        """Start the clock; called just before the agent is invoked."""
+        self.started = time.perf_counter()
+
+    def _start(self, run_id: UUID, event: Dict[str, Any]) -> None:
+        event["start"] = time.perf_counter() - self.started
+        event["duration"] = None
+        self.trace["events"].append(event)
+        self._open[run_id] = event
+
+    def _end(self, run_id: UUID, **fields: Any) -> None:
+        event = self._open.pop(run_id, None)
+        if event is not None:
+            event["duration"] = time.perf_counter() - self.started - event["start"]
+            event.update(fields)
+
+    async def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: List[List[BaseMessage]],
+        *,
+        run_id: UUID,
+        **kwargs: Any,
+    ) -> None:
+        self._start(run_id, {"type": "llm", "input_messages": len(messages[0])})
+
+    async def on_llm_end(
+        self, response: LLMResult, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._end(run_id, output=message_to_dict(response.generations[0][0].message))
+
+    async def on_llm_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._end(run_id, error=repr(error))
+
+    async def on_tool_start(
+        self,
+        serialized: Dict[str, Any],
+        input_str: str,
+        *,
+        run_id: UUID,
+        inputs: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        self._start(
+            run_id,
+            {
+                "type": "tool",
+                "name": serialized.get("name"),
+                "args": inputs if inputs is not None else input_str,
+            },
+        )
+
+    async def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        if isinstance(output, BaseMessage):
+            output = output.content
+        self._end(run_id, output=output)
+
+    async def on_tool_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._end(run_id, error=repr(error))
+
+    def fail(self, error: BaseException) -> None:
+        """Mark the run as failed; the trace is still saved and replayable."""
+        self.trace["error"] = repr(error)
+
+    def finish(self) -> Dict[str, Any]:
+        self.trace["duration"] = time.perf_counter() - self.started
+        return self.trace
+
+    def save(self, directory: str) -> str:
+        """Write the trace as zstd-compressed JSON and return its path."""
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        path = os.path.join(directory, f"{stamp}-{self.trace['id']}.json.zst")
+        with open(path, "wb") as f:
+            f.write(
+                zstandard.ZstdCompressor().compress(
+                    orjson.dumps(self.finish(), default=str)
+                )
+            )
+        return path
+
+
+def load_trace(path: str) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        return orjson.loads(zstandard.ZstdDecompressor().decompress(f.read()))
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Chat model that answers with the LLM responses recorded in a trace, in
+    order, so the tools and agent loop around it can run deterministically.
+    """
+
+    responses: List[BaseMessage]
+    model_name: str = "replay"
+    position: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> "ReplayChatModel":
+        return self
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.position >= len(self.responses):
+            raise ValueError("The trace has no more recorded LLM responses")
+        message = self.responses[self.position]
+        self.position += 1
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def summarize(trace: Dict[str, Any]) -> Dict[str, Any]:
+    """Per-stage latency of a trace: LLM, each tool, and the agent loop itself."""
+    llm = sum(e["duration"] or 0 for e in trace["events"] if e["type"] == "llm")
+    tools: Dict[str, float] = {}
+    for event in trace["events"]:
+        if event["type"] == "tool":
+            tools[event["name"]] = tools.get(event["name"], 0.0) + (
+                event["duration"] or 0
+            )
+    total = trace["duration"] or 0
+    return {
+        "total": total,
+        "llm": llm,
+        "tools": tools,
+        "overhead": total - llm - sum(tools.values()),
+    }
+
+
+async def replay_trace(path: str) -> Dict[str, Any]:
+    """
+    Re-run a recorded request with the recorded LLM outputs and the real tools.
+
+    Returns the per-stage latency of the recording and of the replay, and the
+    number of tool calls whose output differs from the recording.
+    """
+    from mcp_client import run_agent
+
+    recorded = load_trace(path)
+    responses = messages_from_dict(
+        [
+            e["output"]
+            for e in recorded["events"]
+            if e["type"] == "llm" and "output" in e
+        ]
+    )
+    model = ReplayChatModel(responses=responses, model_name=recorded["model"])
+    recorder = TraceRecorder(recorded["messages"], recorded["model"])
+
+    result = await run_agent(
+        {"messages": recorded["messages"]}, chat_model=model, recorder=recorder
+    )
+    replayed = recorder.finish()
+
+    recorded_outputs = [
+        e.get("output") for e in recorded["events"] if e["type"] == "tool"
+    ]
+    replayed_outputs = [
+        e.get("output") for e in replayed["events"] if e["type"] == "tool"
+    ]
+    mismatches = sum(a != b for a, b in zip(recorded_outputs, replayed_outputs))
+    mismatches += abs(len(recorded_outputs) - len(replayed_outputs))
+
+    return {
+        "trace": recorded["id"],
+        "recorded_error": recorded.get("error"),
+        "status": result.get("status"),
+        "recorded": summarize(recorded),
+        "replayed": summarize(replayed),
+        "tool_output_mismatches": mismatches,
+    }
+
+
+if __name__ == "__main__":
+    # python -m app.tracing TRACE [TRACE ...]
+    for trace_path in sys.argv[1:]:
+        report = asyncio.run(replay_trace(trace_path))
+        print(orjson.dumps(report, option=orjson.OPT_INDENT_2).decode())
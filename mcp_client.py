@@ -1,18 +1,19 @@
+import asyncio
+import logging
 import os
-from typing import Any, Dict, List, Tuple, Union
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 # Load environment variables
 from dotenv import load_dotenv
-from langchain.schema import AIMessage, HumanMessage, SystemMessage
-from langchain_core.messages import ToolMessage
-from langchain_mcp_adapters.tools import load_mcp_tools
-from langchain_openai import ChatOpenAI
-from langgraph.prebuilt import create_react_agent
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
 from pydantic import BaseModel, Field
 
+# langchain, langgraph and mcp are imported inside the functions that use
+# them; together they take over a second to import, which would otherwise be
+# paid by every process that imports this module.
+
 load_dotenv()
+logger = logging.getLogger(__name__)
 
 
 class ChatMessage(BaseModel):
@@ -42,33 +43,69 @@ model_config = {
     "temperature": 0.1,
 }
 
-model = ChatOpenAI(**model_config)
+
+@lru_cache(maxsize=1)
+def get_model():
+    """Create the chat model on first use."""
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(**model_config)
+
 
 # MCP server configuration
-server_params = StdioServerParameters(
-    command="python3",
-    args=["-m", "app.mcp_tools.server"],
-)
+server_command = {
+    "command": "python3",
+    "args": ["-m", "app.mcp_tools.server"],
+}
 
 
-async def run_agent(chat_request: Union[Dict[str, Any], ChatRequest]) -> Dict[str, Any]:
+async def run_agent(
+    chat_request: Union[Dict[str, Any], ChatRequest],
+    chat_model: Optional[Any] = None,
+    recorder: Optional[Any] = None,
+) -> Dict[str, Any]:
     """
     Run the MCP agent with the given chat request.
 
     Args:
         chat_request: Either a ChatRequest object or a dictionary containing:
             - messages: List of message tuples (role, content) or dicts with role/content
+        chat_model: Chat model to use instead of the configured OpenAI model,
+            e.g. a ReplayChatModel when replaying a trace
+        recorder: TraceRecorder to capture the run with. When omitted and
+            AGENT_TRACE_DIR is set, the run is recorded to that directory,
+            whether it succeeds, fails or is cancelled.
 
     Returns:
         dict: The agent's response containing messages and metadata
     """
+    from langchain_core.messages import (
+        AIMessage,
+        HumanMessage,
+        SystemMessage,
+        ToolMessage,
+    )
+    from langchain_mcp_adapters.tools import load_mcp_tools
+    from langgraph.prebuilt import create_react_agent
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    from app.prompt_budget import PromptBudget
+    from app.tracing import AGENT_TRACE_DIR, TraceRecorder
+
     # Convert dict to ChatRequest if needed
     if isinstance(chat_request, dict):
         chat_request = ChatRequest(**chat_request)
     elif not isinstance(chat_request, ChatRequest):
         raise ValueError("chat_request must be a dict or ChatRequest object")
 
+    save_trace = recorder is None and AGENT_TRACE_DIR
+    if save_trace:
+        model_name = getattr(chat_model, "model_name", model_config["model"])
+        recorder = TraceRecorder(chat_request.messages, model_name)
+
     try:
+        server_params = StdioServerParameters(**server_command)
         async with stdio_client(server_params) as (read, write):
             async with ClientSession(read, write) as session:
                 # Initialize the connection
@@ -100,9 +137,24 @@ async def run_agent(chat_request: Union[Dict[str, Any], ChatRequest]) -> Dict[st
                     elif role == "tool":
                         formatted_messages.append(ToolMessage(content=content))
 
+                # Bind only the tools this request needs, in compact form, and
+                # keep every model call under the prompt token ceiling
+                model = chat_model or get_model()
+                budget = PromptBudget(model.model_name)
+                tools = budget.prepare_tools(tools, formatted_messages)
+
                 # Create and run the agent
-                agent = create_react_agent(model, tools)
-                agent_response = await agent.ainvoke({"messages": formatted_messages})
+                agent = create_react_agent(
+                    model, tools, pre_model_hook=budget.pre_model_hook
+                )
+                config = {}
+                if recorder:
+                    recorder.start()
+                    config["callbacks"] = [recorder]
+
+                agent_response = await agent.ainvoke(
+                    {"messages": formatted_messages}, config=config
+                )
 
                 print(agent_response.get("messages", []), "MCP agent response")
                 # Format the response
@@ -112,13 +164,29 @@ async def run_agent(chat_request: Union[Dict[str, Any], ChatRequest]) -> Dict[st
                     "metadata": {
                         "model": model.model_name,
                         "tokens_used": len(str(agent_response).split()),
+                        "prompt_tokens": budget.report(),
                     },
                 }
     except Exception as e:
+        if recorder:
+            recorder.fail(e)
         return {"status": "error", "message": str(e), "type": type(e).__name__}
+    except asyncio.CancelledError as e:
+        # Timed out or the client went away; still worth a trace.
+        if recorder:
+            recorder.fail(e)
+        raise
+    finally:
+        if save_trace:
+            try:
+                recorder.save(AGENT_TRACE_DIR)
+            except Exception:
+                logger.exception("Could not save the agent trace")
 
 
 def extract_final_answer(agent_response):
+    from langchain_core.messages import AIMessage
+
     if isinstance(agent_response, list):
         for message in reversed(agent_response):
             if isinstance(message, AIMessage) and message.content:
@@ -3,7 +3,7 @@ import random
 
 from faker import Faker
 
-from app.db import AsyncSessionLocal, Base, engine
+from app.db import AsyncSessionLocal, init_models
 from app.models import Property
 
 fake = Faker()
@@ -41,8 +41,7 @@ async def seed_properties(n=50):
 
 
 async def init():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await init_models()
     await seed_properties()
 
 
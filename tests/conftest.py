@@ -0,0 +1,75 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+# Tests that need Postgres run against TEST_DATABASE_URL (a plain
+# postgresql:// URL to a scratch database; its properties table is dropped
+# and recreated) and are skipped when it is not set. Tests marked
+# ``benchmark`` seed large tables and also need RUN_BENCHMARKS=1.
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+RUN_BENCHMARKS = os.getenv("RUN_BENCHMARKS") == "1"
+
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ["ASYNC_DATABASE_URL"] = (
+        make_url(TEST_DATABASE_URL)
+        .set(drivername="postgresql+asyncpg")
+        .render_as_string(hide_password=False)
+    )
+else:
+    # app.db and the MCP tools build their engines at import time; no
+    # connection is made.
+    os.environ.setdefault("DATABASE_URL", "postgresql://localhost/unused")
+    os.environ.setdefault("ASYNC_DATABASE_URL", "postgresql+asyncpg://localhost/unused")
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "benchmark: slow benchmark, only run with RUN_BENCHMARKS=1"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if RUN_BENCHMARKS:
+        return
+    skip = pytest.mark.skip(reason="benchmarks only run with RUN_BENCHMARKS=1")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session")
+def database_url() -> str:
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    return TEST_DATABASE_URL
+
+
+def create_properties_table(database_url):
+    """Create an empty properties table and yield a sync engine, then drop it."""
+    from app.db import Base
+    from app.models import create_schema
+
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(engine)
+    with engine.begin() as conn:
+        create_schema(conn)
+    try:
+        yield engine
+    finally:
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+
+
+@pytest.fixture
+def properties_table(database_url):
+    """A freshly created, empty properties table; yields a sync engine."""
+    yield from create_properties_table(database_url)
+
+
+@pytest.fixture(scope="module")
+def module_properties_table(database_url):
+    """Like ``properties_table``, shared by the tests of one module."""
+    yield from create_properties_table(database_url)
@@ -0,0 +1,185 @@
+"""
+Cache backends, and a comparison of them at 8 workers.
+
+The comparison runs CACHE_BENCH_WORKERS processes (default 8), as uvicorn
+workers and MCP servers would, each reading the same CACHE_BENCH_ENTRIES
+cached responses. It prints the hit latency and the memory the entries
+take: every worker holds its own copy in the LRU, while Redis holds one
+shared copy. Run with ``-s`` to see the numbers. It needs ``CACHE_URL`` to
+point at a Redis-compatible server (its keys are written under a scratch
+namespace) and is skipped without one.
+"""
+
+import multiprocessing
+import os
+import random
+import statistics
+import time
+import tracemalloc
+import uuid
+
+import pytest
+
+from app.cache import CacheBackend, LRUCache, RedisCache, cached
+
+CACHE_BENCH_WORKERS = int(os.getenv("CACHE_BENCH_WORKERS", "8"))
+CACHE_BENCH_ENTRIES = int(os.getenv("CACHE_BENCH_ENTRIES", "1000"))
+CACHE_BENCH_LOOKUPS = int(os.getenv("CACHE_BENCH_LOOKUPS", "5000"))
+
+
+def test_cache_backend_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
+
+    class Incomplete(CacheBackend):
+        def lookup(self, key):
+            return 0, None
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_lru_drops_writes_from_an_older_generation():
+    cache = LRUCache()
+    generation, _ = cache.lookup("key")
+    cache.clear()
+    cache.set("key", "stale", generation=generation)
+    assert cache.get("key") is None
+
+
+def test_cached_memoizes_results():
+    calls = []
+
+    @cached(LRUCache())
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    assert [square(3), square(3), square(4)] == [9, 9, 16]
+    assert calls == [3, 4]
+
+
+def response(key: int) -> list:
+    """A page of listings shaped like a /properties response."""
+    return [
+        {
+            "id": key * 20 + i,
+            "no_of_bedrooms": 1 + i % 4,
+            "no_of_bathrooms": 1 + i % 3,
+            "carpet_area": 500 + key % 1500,
+            "total_area": 700 + key % 2000,
+            "country": "India",
+            "state": "Karnataka",
+            "city": "Bangalore",
+            "community": "Whitefield",
+            "building_name": f"Tower {key}-{i}",
+            "asking_price": 2000000 + key * 20 + i,
+        }
+        for i in range(20)
+    ]
+
+
+def make_backend(name: str, namespace: str) -> CacheBackend:
+    if name == "redis":
+        return RedisCache(os.environ["CACHE_URL"], namespace)
+    return LRUCache(maxsize=CACHE_BENCH_ENTRIES)
+
+
+def fill(cache: CacheBackend) -> None:
+    for key in range(CACHE_BENCH_ENTRIES):
+        cache.set(str(key), response(key))
+
+
+def worker(name: str, namespace: str, start, results) -> None:
+    cache = make_backend(name, namespace)
+    memory = 0
+    if name == "lru":
+        # Every process fills its own copy.
+        tracemalloc.start()
+        fill(cache)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    keys = random.Random(os.getpid()).choices(
+        [str(key) for key in range(CACHE_BENCH_ENTRIES)], k=CACHE_BENCH_LOOKUPS
+    )
+    start.wait()
+    latencies, misses = [], 0
+    for key in keys:
+        started = time.perf_counter()
+        value = cache.get(key)
+        latencies.append(time.perf_counter() - started)
+        misses += value is None
+    results.put((latencies, misses, memory))
+
+
+def run_workers(name: str, namespace: str) -> tuple:
+    context = multiprocessing.get_context("spawn")
+    start = context.Barrier(CACHE_BENCH_WORKERS)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(name, namespace, start, results))
+        for _ in range(CACHE_BENCH_WORKERS)
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get(timeout=120) for _ in processes]
+    for process in processes:
+        process.join()
+    latencies = sorted(latency for result in collected for latency in result[0])
+    misses = sum(result[1] for result in collected)
+    memory = sum(result[2] for result in collected)
+    return latencies, misses, memory
+
+
+@pytest.fixture
+def redis_namespace():
+    url = os.getenv("CACHE_URL")
+    if not url or not url.startswith(("redis://", "rediss://", "unix://")):
+        pytest.skip("CACHE_URL does not point at a Redis server")
+    import redis
+
+    client = redis.Redis.from_url(url)
+    try:
+        client.ping()
+    except (redis.RedisError, OSError) as error:
+        pytest.skip(f"Redis at CACHE_URL is unavailable: {error}")
+    namespace = f"cache-bench-{uuid.uuid4().hex}"
+    try:
+        yield namespace
+    finally:
+        keys = list(client.scan_iter(f"{namespace}:*"))
+        if keys:
+            client.delete(*keys)
+        client.close()
+
+
+def test_backends_at_8_workers(redis_namespace):
+    import redis
+
+    client = redis.Redis.from_url(os.environ["CACHE_URL"])
+    before = client.info("memory")["used_memory"]
+    fill(make_backend("redis", redis_namespace))
+    redis_memory = client.info("memory")["used_memory"] - before
+    client.close()
+
+    for name in ("lru", "redis"):
+        latencies, misses, memory = run_workers(name, redis_namespace)
+        if name == "redis":
+            memory = redis_memory
+        print(
+            f"{name}: {CACHE_BENCH_WORKERS} workers, {len(latencies)} hits,"
+            f" median {statistics.median(latencies) * 1e6:.1f}us,"
+            f" p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.1f}us,"
+            f" {memory / 1e6:.1f} MB for {CACHE_BENCH_ENTRIES} entries"
+        )
+        assert misses == 0, name
@@ -0,0 +1,152 @@
+"""
+End-to-end propagation lag of the change feed under a bulk update.
+
+Runs against TEST_DATABASE_URL and is skipped without it.
+"""
+
+import asyncio
+import math
+import os
+import time
+
+from sqlalchemy import text
+
+from app.change_feed import NOTIFY_CHUNK, RESYNC, ChangeFeed, listen
+
+BULK_ROWS = int(os.getenv("CHANGE_FEED_BULK_ROWS", "5000"))
+# Seconds allowed between the bulk update and each of its notifications
+# reaching a subscriber.
+CHANGE_FEED_MAX_LAG = float(os.getenv("CHANGE_FEED_MAX_LAG", "2.0"))
+
+INSERT_SQL = text("""
+    INSERT INTO properties (
+        no_of_bedrooms, no_of_bathrooms, carpet_area, total_area, country,
+        state, city, community, building_name, asking_price
+    )
+    SELECT 2, 2, 900, 1100, 'India', 'Karnataka', 'Bangalore', 'Whitefield',
+           'Tower ' || i, 5000000 + i
+    FROM generate_series(1, :rows) AS i
+    """)
+
+
+def execute(engine, sql, **params):
+    with engine.begin() as conn:
+        conn.execute(text(sql) if isinstance(sql, str) else sql, params)
+
+
+async def wait_for(condition, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.05)
+    return True
+
+
+async def start_listening(feed, changes, engine, database_url):
+    """Start the listener and wait until a probe insert comes through."""
+    listener = asyncio.create_task(listen(feed, database_url, reconnect_delay=0.2))
+    for _ in range(50):
+        await asyncio.to_thread(execute, engine, INSERT_SQL, rows=1)
+        if await wait_for(lambda: changes, timeout=0.2):
+            return listener
+    listener.cancel()
+    raise AssertionError("The change feed listener never received a change")
+
+
+def test_bulk_update_propagation_lag(properties_table, database_url):
+    execute(properties_table, INSERT_SQL, rows=BULK_ROWS)
+
+    async def run():
+        feed = ChangeFeed()
+        changes = []
+        lags = []
+        feed.subscribe(changes.append)
+        feed.subscribe(lambda change: lags.append(change.lag))
+        listener = await start_listening(feed, changes, properties_table, database_url)
+        try:
+            changes.clear()
+            with properties_table.connect() as conn:
+                # The bulk rows plus the listener's probe rows.
+                expected = conn.execute(
+                    text("SELECT count(*) FROM properties")
+                ).scalar()
+            await asyncio.to_thread(
+                execute,
+                properties_table,
+                "UPDATE properties SET asking_price = asking_price + 1",
+            )
+            assert await wait_for(
+                lambda: sum(len(change.ids) for change in changes) >= expected,
+                timeout=30,
+            )
+            return list(zip(changes, lags)), expected
+        finally:
+            listener.cancel()
+
+    received, expected = asyncio.run(run())
+    # One notification per NOTIFY_CHUNK rows of the statement, not per row.
+    assert len(received) == math.ceil(expected / NOTIFY_CHUNK)
+    assert {change.op for change, _ in received} == {"UPDATE"}
+    assert not any(change.place_changed for change, _ in received)
+    assert len({id_ for change, _ in received for id_ in change.ids}) == expected
+    lags = sorted(lag for _, lag in received)
+    print(
+        f"{expected} rows in {len(lags)} notifications:"
+        f" median lag {lags[len(lags) // 2] * 1000:.1f} ms,"
+        f" max {lags[-1] * 1000:.1f} ms"
+    )
+    assert lags[-1] < CHANGE_FEED_MAX_LAG
+
+
+def test_changes_flag_place_edits(properties_table, database_url):
+    execute(properties_table, INSERT_SQL, rows=3)
+
+    async def run():
+        feed = ChangeFeed()
+        changes = []
+        feed.subscribe(changes.append)
+        listener = await start_listening(feed, changes, properties_table, database_url)
+        try:
+            changes.clear()
+            for sql in [
+                "UPDATE properties SET asking_price = asking_price + 1",
+                "UPDATE properties SET community = 'Bellandur' WHERE id = 1",
+                "DELETE FROM properties WHERE id = 2",
+            ]:
+                await asyncio.to_thread(execute, properties_table, sql)
+            assert await wait_for(lambda: len(changes) >= 3, timeout=10)
+            return changes
+        finally:
+            listener.cancel()
+
+    changes = asyncio.run(run())
+    assert [(change.op, change.place_changed) for change in changes] == [
+        ("UPDATE", False),
+        ("UPDATE", True),
+        ("DELETE", True),
+    ]
+    assert changes[1].ids == (1,)
+    assert changes[2].ids == (2,)
+
+
+def test_reconnect_publishes_resync(properties_table, database_url):
+    async def run():
+        feed = ChangeFeed()
+        changes = []
+        feed.subscribe(changes.append)
+        listener = await start_listening(feed, changes, properties_table, database_url)
+        try:
+            assert RESYNC not in changes
+            await asyncio.to_thread(
+                execute,
+                properties_table,
+                "SELECT pg_terminate_backend(pid) FROM pg_stat_activity"
+                " WHERE query LIKE 'LISTEN%' AND pid <> pg_backend_pid()",
+            )
+            assert await wait_for(lambda: RESYNC in changes, timeout=10)
+            assert not listener.done()
+        finally:
+            listener.cancel()
+
+    asyncio.run(run())
@@ -0,0 +1,33 @@
+import asyncio
+import logging
+
+import pytest
+from fastapi import HTTPException
+
+from app.db import get_db, get_read_db
+
+
+@pytest.mark.parametrize("dependency", [get_db, get_read_db])
+def test_http_errors_are_not_logged_as_database_failures(dependency, caplog):
+    async def run():
+        sessions = dependency()
+        await sessions.__anext__()
+        await sessions.athrow(HTTPException(status_code=404))
+
+    with caplog.at_level(logging.ERROR, logger="app.db"):
+        with pytest.raises(HTTPException):
+            asyncio.run(run())
+    assert not caplog.records
+
+
+@pytest.mark.parametrize("dependency", [get_db, get_read_db])
+def test_database_errors_are_logged(dependency, caplog):
+    async def run():
+        sessions = dependency()
+        await sessions.__anext__()
+        await sessions.athrow(RuntimeError("connection reset"))
+
+    with caplog.at_level(logging.ERROR, logger="app.db"):
+        with pytest.raises(RuntimeError):
+            asyncio.run(run())
+    assert [record.message for record in caplog.records] == ["Database session failed"]
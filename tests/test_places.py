@@ -0,0 +1,191 @@
+import threading
+import time
+
+from sqlalchemy import text
+
+from app.mcp_tools.places import PlaceIndex, PlaceTrie
+
+CITIES = ["Bangalore", "Mumbai", "Navi Mumbai", "Hyderabad", "Pune", "bangalore"]
+COMMUNITIES = ["Koramangala", "Whitefield", "Indiranagar", "Kothrud"]
+
+
+def test_resolve_exact_match_returns_every_spelling():
+    trie = PlaceTrie(CITIES)
+    assert trie.resolve("Bangalore") == ["Bangalore", "bangalore"]
+    assert trie.resolve("  BANGALORE ") == ["Bangalore", "bangalore"]
+
+
+def test_resolve_misspellings():
+    assert PlaceTrie(CITIES).resolve("hydrabad") == ["Hyderabad"]
+    assert PlaceTrie(COMMUNITIES).resolve("koramangla") == ["Koramangala"]
+
+
+def test_resolve_unique_prefix():
+    assert PlaceTrie(CITIES).resolve("hyder") == ["Hyderabad"]
+
+
+def test_resolve_leaves_prefix_inside_another_name_unresolved():
+    # "mum" starts "Mumbai" but also occurs in "Navi Mumbai".
+    assert PlaceTrie(CITIES).resolve("mum") is None
+    assert PlaceTrie(["Mumbai", "Pune"]).resolve("mum") == ["Mumbai"]
+
+
+def test_resolve_ambiguous_or_empty():
+    trie = PlaceTrie(COMMUNITIES)
+    assert trie.resolve("ko") is None
+    assert trie.resolve("") is None
+    assert trie.resolve(" - ") is None
+    assert trie.resolve("delhi") is None
+
+
+def test_lookups_return_the_first_spelling_added():
+    trie = PlaceTrie(["bangalore", "Bangalore"])
+    assert trie.prefix("bangal") == ["bangalore"]
+    assert PlaceTrie(CITIES).suggest("bangalor") == ["Bangalore"]
+
+
+def test_suggest_prefix_matches_then_fuzzy():
+    trie = PlaceTrie(CITIES)
+    assert trie.suggest("mum") == ["Mumbai"]
+    assert trie.suggest("hydrabad") == ["Hyderabad"]
+    assert trie.suggest("pun", limit=1) == ["Pune"]
+    assert trie.suggest("") == []
+
+
+def test_fuzzy_orders_by_distance():
+    trie = PlaceTrie(COMMUNITIES)
+    assert trie.fuzzy("koramangla") == [(1, "Koramangala")]
+    assert trie.fuzzy("kothrd", max_distance=1) == [(1, "Kothrud")]
+    assert trie.fuzzy("whitefield", max_distance=0) == [(0, "Whitefield")]
+    assert trie.fuzzy("") == []
+
+
+def test_add_keeps_names_unique():
+    trie = PlaceTrie(["Pune"])
+    trie.add("Pune")
+    trie.add("pune")
+    trie.add("")
+    assert trie.size == 1
+    assert trie.get("PUNE") == ["Pune", "pune"]
+
+
+def test_place_index_loads_lazily_and_reloads_after_invalidate():
+    cities = list(CITIES)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return cities, COMMUNITIES
+
+    index = PlaceIndex(loader)
+    assert not loads
+    assert index.resolve_city("pune") == ["Pune"]
+    assert index.resolve_community("whitefeild") == ["Whitefield"]
+    assert index.suggest("ko", kind="community") == {
+        "communities": ["Kothrud", "Koramangala"]
+    }
+    assert len(loads) == 1
+
+    cities.append("Chennai")
+    assert index.resolve_city("chennai") is None
+    index.invalidate()
+    assert index.resolve_city("chennai") == ["Chennai"]
+    assert len(loads) == 2
+
+
+def test_place_index_reloads_after_ttl():
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return CITIES, COMMUNITIES
+
+    index = PlaceIndex(loader, ttl=0)
+    index.resolve_city("pune")
+    index.resolve_city("pune")
+    assert len(loads) == 2
+
+
+def test_place_index_keeps_an_invalidation_made_during_a_reload():
+    loading, release = threading.Event(), threading.Event()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        if len(loads) == 1:
+            loading.set()
+            release.wait(5)
+        return CITIES, COMMUNITIES
+
+    index = PlaceIndex(loader)
+    reader = threading.Thread(target=index.resolve_city, args=("pune",))
+    reader.start()
+    assert loading.wait(5)
+    invalidator = threading.Thread(target=index.invalidate)
+    invalidator.start()
+    time.sleep(0.05)
+    release.set()
+    reader.join()
+    invalidator.join()
+
+    index.resolve_city("pune")
+    assert len(loads) == 2
+
+
+def test_property_places_follow_writes(properties_table):
+    def places():
+        with properties_table.connect() as conn:
+            return dict(
+                conn.execute(
+                    text("SELECT kind || ':' || name, listings FROM property_places")
+                ).all()
+            )
+
+    with properties_table.begin() as conn:
+        conn.execute(text("""
+                INSERT INTO properties (
+                    no_of_bedrooms, no_of_bathrooms, carpet_area, total_area,
+                    country, state, city, community, asking_price
+                )
+                SELECT 2, 2, 900, 1100, 'India', 'Karnataka',
+                       (ARRAY['Bangalore', 'bangalore', 'Pune'])[1 + i % 3],
+                       CASE WHEN i % 2 = 0 THEN 'Whitefield' END, 5000000
+                FROM generate_series(1, 300) AS i
+                """))
+    assert places() == {
+        "city:Bangalore": 100,
+        "city:bangalore": 100,
+        "city:Pune": 100,
+        "community:Whitefield": 150,
+    }
+
+    with properties_table.begin() as conn:
+        conn.execute(
+            text("UPDATE properties SET city = 'Bangalore' WHERE city = 'bangalore'")
+        )
+        conn.execute(text("UPDATE properties SET asking_price = asking_price + 1"))
+        conn.execute(text("DELETE FROM properties WHERE community IS NULL"))
+    assert places() == {
+        "city:Bangalore": 100,
+        "city:Pune": 50,
+        "community:Whitefield": 150,
+    }
+
+
+def test_load_places_orders_spellings_by_listings(properties_table):
+    from app.mcp_tools.tools import _load_places
+
+    with properties_table.begin() as conn:
+        conn.execute(text("""
+                INSERT INTO properties (
+                    no_of_bedrooms, no_of_bathrooms, carpet_area, total_area,
+                    country, state, city, asking_price
+                )
+                SELECT 2, 2, 900, 1100, 'India', 'Karnataka',
+                       CASE WHEN i <= 3 THEN 'bangalore' ELSE 'Bangalore' END,
+                       5000000
+                FROM generate_series(1, 10) AS i
+                """))
+    cities, communities = _load_places()
+    assert cities == ["Bangalore", "bangalore"]
+    assert communities == []
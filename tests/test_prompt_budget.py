@@ -0,0 +1,239 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.tools import StructuredTool
+
+import app.prompt_budget
+from app.prompt_budget import (
+    CORE_TOOLS,
+    PromptBudget,
+    PromptBudgetExceeded,
+    arg_descriptions,
+    compact_schema,
+    compact_tool,
+    select_tools,
+)
+
+SUGGEST_PLACES_DOC = """
+    Suggest city and community names matching partial or misspelled input.
+
+    Use this to find the exact spelling of a place before searching, e.g.
+    "hydrabad" or "koramangla".
+
+    Args:
+        query: Partial or misspelled place name
+        kind (str, optional): "city", "community" or "any". Defaults
+            to "any".
+        limit (int, optional): Maximum number of suggestions
+
+    Returns:
+        dict: Matching names by kind
+    """
+
+SUGGEST_PLACES_SCHEMA = {
+    "type": "object",
+    "title": "suggest_placesArguments",
+    "properties": {
+        "query": {"type": "string", "title": "Query"},
+        "kind": {
+            "anyOf": [{"type": "string"}, {"type": "null"}],
+            "default": None,
+            "title": "Kind",
+        },
+        "limit": {"type": "integer", "default": 10, "title": "Limit"},
+    },
+    "required": ["query"],
+}
+
+
+def make_tool(name, description="Look something up.", schema=None):
+    async def run(**kwargs):
+        return ""
+
+    return StructuredTool(
+        name=name,
+        description=description,
+        args_schema=schema or {"type": "object", "properties": {}},
+        coroutine=run,
+    )
+
+
+ALL_TOOLS = [
+    make_tool(name)
+    for name in sorted(CORE_TOOLS)
+    + ["compare_properties", "get_price_trends", "get_community_stats"]
+]
+
+
+def selected(messages):
+    return {tool.name for tool in select_tools(ALL_TOOLS, messages)} - CORE_TOOLS
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    """A budget counting tokens by estimate, so counts do not depend on tiktoken."""
+    monkeypatch.setattr(app.prompt_budget, "get_encoding", lambda model_name: None)
+
+    def make(max_tokens, old_tool_result_chars=500):
+        return PromptBudget("test-model", max_tokens, old_tool_result_chars)
+
+    return make
+
+
+def test_compact_schema():
+    assert compact_schema(SUGGEST_PLACES_SCHEMA) == {
+        "type": "object",
+        "properties": {
+            "query": {"type": "string"},
+            "kind": {"type": "string"},
+            "limit": {"type": "integer", "default": 10},
+        },
+        "required": ["query"],
+    }
+
+
+def test_compact_schema_keeps_arguments_named_like_keywords():
+    schema = {"type": "object", "properties": {"title": {"type": "string"}}}
+    assert compact_schema(schema) == schema
+
+
+def test_compact_schema_keeps_real_unions():
+    union = {"anyOf": [{"type": "string"}, {"type": "integer"}, {"type": "null"}]}
+    assert compact_schema(union) == union
+
+
+def test_arg_descriptions():
+    assert arg_descriptions(SUGGEST_PLACES_DOC) == {
+        "query": "Partial or misspelled place name",
+        "kind": '"city", "community" or "any". Defaults to "any".',
+        "limit": "Maximum number of suggestions",
+    }
+    assert arg_descriptions("Do something.") == {}
+
+
+def test_compact_tool_keeps_usage_guidance_and_moves_args_into_schema():
+    tool = compact_tool(
+        make_tool("suggest_places", SUGGEST_PLACES_DOC, SUGGEST_PLACES_SCHEMA)
+    )
+    assert tool.description == (
+        "Suggest city and community names matching partial or misspelled input."
+        "\n\nUse this to find the exact spelling of a place before searching,"
+        ' e.g. "hydrabad" or "koramangla".'
+    )
+    properties = tool.args_schema["properties"]
+    assert properties["query"]["description"] == "Partial or misspelled place name"
+    assert properties["limit"] == {
+        "type": "integer",
+        "default": 10,
+        "description": "Maximum number of suggestions",
+    }
+
+
+def test_select_tools_matches_recent_user_messages():
+    assert selected([HumanMessage("3 bedroom flats in Pune")]) == set()
+    assert selected([HumanMessage("Price trends in Pune?")]) == {"get_price_trends"}
+    assert selected(
+        [
+            HumanMessage("Compare 12 and 40"),
+            AIMessage("12 is larger."),
+            HumanMessage("And which is cheaper?"),
+        ]
+    ) == {"compare_properties"}
+
+
+def test_select_tools_forgets_intents_older_than_the_turn_window():
+    messages = [HumanMessage("Compare 12 and 40")] + [
+        HumanMessage(f"Follow-up {i}") for i in range(3)
+    ]
+    assert selected(messages) == set()
+    assert {tool.name for tool in select_tools(ALL_TOOLS, messages, turns=4)} >= {
+        "compare_properties"
+    }
+
+
+def test_select_tools_keeps_tools_already_called():
+    messages = [
+        HumanMessage("Tell me about Whitefield"),
+        AIMessage(
+            "",
+            tool_calls=[{"name": "get_community_stats", "args": {}, "id": "call_1"}],
+        ),
+        ToolMessage("...", tool_call_id="call_1", name="get_community_stats"),
+        HumanMessage("Thanks"),
+        HumanMessage("Anything else?"),
+        HumanMessage("OK"),
+    ]
+    assert selected(messages) == {"get_community_stats"}
+    assert selected(messages[2:]) == {"get_community_stats"}
+
+
+def test_prepare_tools_drops_intent_tools_over_budget(budget):
+    messages = [HumanMessage("Compare 12 and 40")]
+    roomy = budget(10_000)
+    assert {tool.name for tool in roomy.prepare_tools(ALL_TOOLS, messages)} == (
+        CORE_TOOLS | {"compare_properties"}
+    )
+
+    core_tokens = roomy.count_tools([make_tool(name) for name in CORE_TOOLS])
+    tight = budget(core_tokens)
+    tools = tight.prepare_tools(ALL_TOOLS, messages)
+    assert {tool.name for tool in tools} == CORE_TOOLS
+    assert tight.tool_tokens == core_tokens
+
+    with pytest.raises(PromptBudgetExceeded, match="tool schemas"):
+        budget(core_tokens - 1).prepare_tools(ALL_TOOLS, messages)
+
+
+def tool_round(call_id, result):
+    return [
+        AIMessage("", tool_calls=[{"name": "search", "args": {}, "id": call_id}]),
+        ToolMessage(result, tool_call_id=call_id),
+    ]
+
+
+def test_trim_truncates_tool_results_before_the_latest_call(budget):
+    messages = [
+        SystemMessage("You are a property assistant."),
+        HumanMessage("Flats in Pune"),
+        *tool_round("call_1", "x" * 2000),
+        *tool_round("call_2", "y" * 2000),
+    ]
+    trimmed = budget(10_000, old_tool_result_chars=100).trim(messages)
+    assert trimmed[3].content == "x" * 100 + "... [1900 characters truncated]"
+    assert trimmed[5].content == "y" * 2000
+    assert trimmed[:3] == messages[:3]
+
+
+def test_trim_drops_oldest_turns_first(budget):
+    system = SystemMessage("You are a property assistant.")
+    old_turn = [HumanMessage("Flats in Pune " * 100), AIMessage("Found 3. " * 100)]
+    current = [HumanMessage("And in Mumbai?")]
+    limit = budget(10_000).count_messages([system] + current) + 10
+    assert budget(limit).trim([system, *old_turn, *current]) == [system, *current]
+
+
+def test_trim_shortens_current_tool_results_last(budget):
+    messages = [HumanMessage("Flats in Pune"), *tool_round("call_1", "x" * 4000)]
+    tight = budget(300)
+    trimmed = tight.trim(messages)
+    assert len(trimmed) == len(messages)
+    assert len(trimmed[2].content) < 1000
+    assert tight.count_messages(trimmed) <= 300
+
+
+def test_trim_raises_when_the_prompt_cannot_fit(budget):
+    with pytest.raises(PromptBudgetExceeded, match="prompt and tool schemas"):
+        budget(50).trim([HumanMessage("Flats in Pune " * 100)])
+
+
+def test_pre_model_hook_reports_tokens_saved(budget):
+    tracked = budget(10_000, old_tool_result_chars=100)
+    messages = [
+        HumanMessage("Flats in Pune"),
+        *tool_round("call_1", "x" * 2000),
+        *tool_round("call_2", "y"),
+    ]
+    hook = tracked.pre_model_hook({"messages": messages})
+    assert hook["llm_input_messages"][2].content.startswith("x" * 100 + "...")
+    report = tracked.report()
+    assert report["model_calls"] == 1
+    assert report["after"] < report["before"]
@@ -0,0 +1,143 @@
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.routing import (
+    REPLICA_LAG_SQL,
+    REPLICA_MAX_LAG_SECONDS,
+    AsyncReadRouter,
+    ReadRouter,
+)
+
+# Engines connect lazily, so routing decisions need no servers.
+PRIMARY = "postgresql://primary/db"
+REPLICAS = ["postgresql://replica1/db", "postgresql://replica2/db"]
+
+
+@pytest.fixture
+def make_router():
+    routers = []
+
+    def make(replicas=REPLICAS, **kwargs):
+        router = ReadRouter(PRIMARY, replicas, **kwargs)
+        routers.append(router)
+        return router
+
+    yield make
+    for router in routers:
+        router.dispose()
+
+
+def engine_of(target, workload="interactive"):
+    return target.engines[workload]
+
+
+def test_reads_go_to_the_primary_without_healthy_replicas(make_router):
+    router = make_router()
+    assert router._choose("interactive", False) is engine_of(router.primary)
+
+    router.replicas[0].lag = REPLICA_MAX_LAG_SECONDS + 1
+    assert router._choose("interactive", False) is engine_of(router.primary)
+
+    router = make_router(replicas=[])
+    assert router._choose("analytics", False) is engine_of(router.primary, "analytics")
+
+
+def test_unhealthy_replicas_are_skipped(make_router):
+    router = make_router()
+    router.replicas[0].lag = None  # the last check failed
+    router.replicas[1].lag = 0.5
+    for _ in range(3):
+        assert router._choose("interactive", False) is engine_of(router.replicas[1])
+    assert router._choose("analytics", False) is engine_of(
+        router.replicas[1], "analytics"
+    )
+
+
+def test_round_robin_alternates_between_healthy_replicas(make_router):
+    router = make_router()
+    for replica in router.replicas:
+        replica.lag = 0
+    chosen = [router._choose("interactive", False) for _ in range(4)]
+    first, second = (engine_of(replica) for replica in router.replicas)
+    assert chosen == [first, second, first, second]
+
+
+def test_least_connections_picks_the_idlest_replica(make_router):
+    router = make_router(balancing="least_connections")
+    for replica, checked_out in zip(router.replicas, (3, 1)):
+        replica.lag = 0
+        engine_of(replica).pool.checkedout = lambda n=checked_out: n
+    assert router._choose("interactive", False) is engine_of(router.replicas[1])
+
+    engine_of(router.replicas[0]).pool.checkedout = lambda: 0
+    assert router._choose("interactive", False) is engine_of(router.replicas[0])
+
+
+def test_pin_primary_sends_fresh_reads_to_the_primary(make_router):
+    router = make_router(replicas=REPLICAS[:1])
+    router.replicas[0].lag = 0
+    router.pin_primary()
+    assert router._choose("interactive", True) is engine_of(router.primary)
+    assert router._choose("interactive", False) is engine_of(router.replicas[0])
+
+    router.primary_until = 0.0
+    assert router._choose("interactive", True) is engine_of(router.replicas[0])
+
+
+def test_invalid_arguments(make_router):
+    with pytest.raises(ValueError, match="balancing"):
+        make_router(balancing="random")
+    with pytest.raises(ValueError, match="workload"):
+        make_router()._choose("reporting", False)
+
+
+def test_primary_engine_is_shared_for_interactive_reads(make_router):
+    engine = create_engine(PRIMARY)
+    router = make_router(primary_engine=engine)
+    assert engine_of(router.primary) is engine
+    assert engine_of(router.primary, "analytics") is not engine
+    assert all(engine_of(replica) is not engine for replica in router.replicas)
+
+
+def test_replica_lag_probe(database_url):
+    # The primary stands in as its own replica, so the lag is always 0.
+    engine = create_engine(database_url)
+    with engine.connect() as conn:
+        assert float(conn.scalar(REPLICA_LAG_SQL)) == 0
+
+    router = ReadRouter(database_url, [database_url], primary_engine=engine)
+    try:
+        replica = router.replicas[0]
+        assert router._probe(replica) == 0
+        router._check(replica)
+        assert replica.healthy
+        assert router._choose("interactive", False) is engine_of(replica)
+    finally:
+        router.dispose()
+
+
+def test_async_replica_lag_probe(database_url):
+    url = os.environ["ASYNC_DATABASE_URL"]
+
+    async def run():
+        router = AsyncReadRouter(url, [url])
+        try:
+            replica = router.replicas[0]
+            lag = await router._probe(replica)
+            await router._check(replica)
+            return lag, replica.healthy
+        finally:
+            await router.dispose()
+
+    assert asyncio.run(run()) == (0, True)
+
+
+def test_failed_probe_takes_the_replica_out_of_rotation(make_router):
+    router = make_router(replicas=["postgresql://localhost:1/db"])
+    replica = router.replicas[0]
+    replica.lag = 0
+    router._check(replica)
+    assert replica.lag is None and not replica.healthy
@@ -0,0 +1,108 @@
+"""
+Upgrading a database created before the change feed, text search and
+place table existed. Runs against TEST_DATABASE_URL and is skipped without it.
+"""
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+# The properties table as the first release created it.
+BASELINE_DDL = [
+    """
+    CREATE TABLE properties (
+        id SERIAL PRIMARY KEY,
+        no_of_bedrooms INTEGER NOT NULL,
+        no_of_bathrooms INTEGER NOT NULL,
+        carpet_area INTEGER NOT NULL,
+        total_area INTEGER NOT NULL,
+        country VARCHAR NOT NULL,
+        state VARCHAR NOT NULL,
+        city VARCHAR NOT NULL,
+        community VARCHAR,
+        building_name VARCHAR,
+        asking_price INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX ix_properties_id ON properties (id)",
+    "CREATE INDEX ix_properties_city ON properties (city)",
+    """
+    INSERT INTO properties (
+        no_of_bedrooms, no_of_bathrooms, carpet_area, total_area, country,
+        state, city, community, building_name, asking_price
+    )
+    VALUES (2, 2, 900, 1100, 'India', 'Karnataka', 'Bangalore', 'Whitefield',
+            'Prestige Towers', 5000000),
+           (3, 2, 1200, 1400, 'India', 'Maharashtra', 'Pune', NULL,
+            'Sobha Heights', 7000000)
+    """,
+]
+
+
+@pytest.fixture
+def baseline_database(database_url):
+    from app.db import Base
+    import app.models  # noqa: F401  registers the tables on Base.metadata
+
+    engine = create_engine(database_url)
+    Base.metadata.drop_all(engine)
+    with engine.begin() as conn:
+        for statement in BASELINE_DDL:
+            conn.execute(text(statement))
+    try:
+        yield engine
+    finally:
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+
+
+def test_create_schema_upgrades_an_existing_database(baseline_database):
+    from app.models import create_schema
+
+    for _ in range(2):  # a second run must be a no-op
+        with baseline_database.begin() as conn:
+            create_schema(conn)
+
+    inspector = inspect(baseline_database)
+    columns = {column["name"] for column in inspector.get_columns("properties")}
+    assert {"updated_at", "version", "search_document"} <= columns
+    indexes = {index["name"] for index in inspector.get_indexes("properties")}
+    assert {"ix_properties_search_document", "ix_properties_community"} <= indexes
+
+    with baseline_database.begin() as conn:
+        places = conn.execute(
+            text("SELECT kind, name, listings FROM property_places ORDER BY 1, 2")
+        ).all()
+        assert places == [
+            ("city", "Bangalore", 1),
+            ("city", "Pune", 1),
+            ("community", "Whitefield", 1),
+        ]
+        assert conn.execute(
+            text(
+                "SELECT id FROM properties"
+                " WHERE search_document @@ to_tsquery('english', 'sobha:*')"
+            )
+        ).scalars().all() == [2]
+
+        conn.execute(text("UPDATE properties SET asking_price = asking_price + 1"))
+        assert conn.execute(
+            text("SELECT version FROM properties ORDER BY id")
+        ).scalars().all() == [2, 2]
+
+        triggers = set(
+            conn.execute(
+                text(
+                    "SELECT tgname FROM pg_trigger"
+                    " WHERE tgrelid = 'properties'::regclass AND NOT tgisinternal"
+                )
+            ).scalars()
+        )
+    assert triggers == {
+        "touch_property",
+        "notify_property_change_insert",
+        "notify_property_change_update",
+        "notify_property_change_delete",
+        "count_property_places_insert",
+        "count_property_places_update",
+        "count_property_places_delete",
+    }
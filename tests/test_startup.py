@@ -0,0 +1,83 @@
+"""
+Startup regression tests.
+
+``import app.main`` must stay light: langchain, langgraph and the MCP client
+are imported on the first /chat request, not when a worker starts. The MCP
+server is started once per chat request, so ``import app.mcp_tools.server``
+must not pull in the agent stack either.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import create_engine, inspect
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative seconds each entry point may take to import under
+# ``-X importtime``.
+STARTUP_IMPORT_BUDGET = float(os.getenv("STARTUP_IMPORT_BUDGET", "1.5"))
+# Packages each entry point must not import until they are needed.
+DEFERRED_PACKAGES = {
+    "app.main": ("langchain", "langgraph", "mcp", "openai", "tiktoken", "pyarrow"),
+    "app.mcp_tools.server": ("langchain", "langgraph", "openai", "tiktoken", "pyarrow"),
+}
+
+
+def import_times(module: str) -> dict:
+    """Cumulative import time in seconds of every module loaded by ``module``."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+@pytest.mark.parametrize("module", sorted(DEFERRED_PACKAGES))
+def test_import_defers_heavy_packages(module):
+    loaded = import_times(module)
+    deferred = sorted(
+        name
+        for name in loaded
+        if name.split(".")[0].split("_")[0] in DEFERRED_PACKAGES[module]
+    )
+    assert not deferred, deferred
+
+
+@pytest.mark.parametrize("module", sorted(DEFERRED_PACKAGES))
+def test_import_time(module):
+    seconds = import_times(module)[module]
+    print(f"import {module}: {seconds:.3f}s")
+    assert seconds < STARTUP_IMPORT_BUDGET
+
+
+def test_init_models_script_creates_tables(database_url):
+    engine = create_engine(database_url)
+    try:
+        with engine.begin() as conn:
+            conn.exec_driver_sql("DROP TABLE IF EXISTS properties")
+
+        subprocess.run(
+            [sys.executable, "-m", "app.db"],
+            cwd=ROOT,
+            env=dict(os.environ, PYTHONPATH=ROOT),
+            check=True,
+        )
+        assert "properties" in inspect(engine).get_table_names()
+    finally:
+        with engine.begin() as conn:
+            conn.exec_driver_sql("DROP TABLE IF EXISTS properties")
+        engine.dispose()